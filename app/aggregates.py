@@ -0,0 +1,260 @@
+import io
+import re
+import base64
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+# --- Index configuration ---
+HISTOGRAM_BINS = 30
+MAX_CATEGORIES = 50        # Columns with at most this many distinct values are "low-cardinality"
+MAX_CORRELATION_COLUMNS = 50
+MAX_GROUP_COLUMNS = 10     # Low-cardinality columns pre-aggregated by
+AGGREGATIONS = ["mean", "median", "sum", "min", "max", "count"]
+
+# Words that mean the user wants something done, not just looked up
+ACTION_WORDS = {
+    "clean", "fill", "drop", "remove", "impute", "replace", "fix", "encode",
+    "predict", "train", "model", "forecast", "classify", "cluster", "filter"
+}
+AGG_ALIASES = {
+    "mean": "mean", "average": "mean", "avg": "mean",
+    "median": "median",
+    "sum": "sum", "total": "sum",
+    "min": "min", "minimum": "min", "lowest": "min",
+    "max": "max", "maximum": "max", "highest": "max",
+    "count": "count", "number": "count"
+}
+
+
+# ------------------------------------------------------------------
+# Building the index (at upload time)
+# ------------------------------------------------------------------
+def build_aggregate_index(df: pd.DataFrame, version_id=None) -> dict:
+    """
+    Precomputes the answers to the most common questions about a dataset:
+    null counts, per-column histograms/value counts, a correlation matrix and
+    group-by aggregates over low-cardinality columns.
+    `version_id` ties the index to the dataset version it describes.
+    """
+    numeric_cols = list(df.select_dtypes(include='number').columns)
+    nunique = df.nunique(dropna=True)
+    low_cardinality = [c for c in df.columns if nunique[c] <= MAX_CATEGORIES]
+
+    histograms = {}
+    for col in df.columns:
+        series = df[col].dropna()
+        if col in numeric_cols and nunique[col] > MAX_CATEGORIES:
+            counts, edges = np.histogram(series.to_numpy(dtype=float), bins=HISTOGRAM_BINS)
+            histograms[col] = {"kind": "numeric", "counts": counts.tolist(), "edges": edges.tolist()}
+        elif col in numeric_cols:
+            # Ratings, small integer codes, ...: one bar per value, in value order
+            counts = series.value_counts().sort_index()
+            histograms[col] = {"kind": "discrete", "labels": [str(v) for v in counts.index], "counts": counts.tolist()}
+        elif col in low_cardinality:
+            counts = series.value_counts()
+            histograms[col] = {"kind": "categorical", "labels": [str(v) for v in counts.index], "counts": counts.tolist()}
+
+    corr_cols = numeric_cols[:MAX_CORRELATION_COLUMNS]
+    correlation = df[corr_cols].corr() if len(corr_cols) >= 2 else None
+
+    group_by = {}
+    for col in [c for c in low_cardinality if c not in numeric_cols or nunique[c] <= 20][:MAX_GROUP_COLUMNS]:
+        values = [c for c in numeric_cols if c != col]
+        if values:
+            group_by[col] = df.groupby(col, observed=True)[values].agg(AGGREGATIONS)
+
+    return {
+        "version_id": version_id,
+        "columns": list(df.columns),
+        "numeric_columns": numeric_cols,
+        "row_count": len(df),
+        "null_counts": {col: int(n) for col, n in df.isnull().sum().items()},
+        "duplicates": int(df.duplicated().sum()),
+        "histograms": histograms,
+        "correlation": correlation,
+        "group_by": group_by,
+        "answers": {}  # Rendered fast-path answers, keyed by intent
+    }
+
+
+# ------------------------------------------------------------------
+# Answering questions from the index
+# ------------------------------------------------------------------
+def _normalize(text: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', str(text).lower())
+
+
+def match_column(text: str, columns):
+    """Finds the column a phrase refers to ("the 'Age' column" -> Age), or None."""
+    text = re.sub(r"\b(the|column|col|field|variable|values?)\b", " ", text.strip().lower())
+    wanted = _normalize(text)
+    if not wanted:
+        return None
+    for col in columns:
+        if _normalize(col) == wanted:
+            return col
+    return None
+
+
+def _figure_to_base64(fig: Figure) -> str:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _answer(text, code, image=None, tables=None):
+    return {"response_text": text, "generated_code": code, "image_output": image, "tables": tables or []}
+
+
+def _missing_values(index):
+    missing = {c: n for c, n in index["null_counts"].items() if n > 0}
+    table = pd.Series(index["null_counts"], name="missing").rename_axis("column")
+    if missing:
+        lines = [f"- **{c}**: {n} ({n / index['row_count']:.1%})" for c, n in missing.items()]
+        text = "Missing values per column:\n" + "\n".join(lines)
+    else:
+        text = "There are no missing values in this dataset."
+    text += f"\n\nDuplicate rows: {index['duplicates']}."
+    return _answer(text, "print(df.isnull().sum())\nprint(df.duplicated().sum())", tables=[("Missing values", table)])
+
+
+def _distribution(index, col):
+    hist = index["histograms"].get(col)
+    if hist is None:
+        return None  # High-cardinality text column: let the LLM decide what to do
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if hist["kind"] == "numeric":
+        edges = np.array(hist["edges"])
+        ax.bar(edges[:-1], hist["counts"], width=np.diff(edges), align='edge', color='#4e79a7', edgecolor='white')
+        ax.set_xlabel(str(col))
+        code = f"plt.hist(df[{col!r}].dropna(), bins={HISTOGRAM_BINS})"
+    elif hist["kind"] == "discrete":
+        ax.bar(hist["labels"], hist["counts"], color='#4e79a7')
+        ax.set_xlabel(str(col))
+        ax.set_ylabel("Count")
+        code = f"df[{col!r}].value_counts().sort_index().plot.bar()"
+    else:
+        labels, counts = hist["labels"][:30], hist["counts"][:30]
+        ax.barh(labels[::-1], counts[::-1], color='#4e79a7')
+        ax.set_xlabel("Count")
+        code = f"df[{col!r}].value_counts().plot.barh()"
+    ax.set_title(f"Distribution of {col}")
+    code += f"\nplt.title('Distribution of {col}')"
+    return _answer(f"Here is the distribution of **{col}**.", code, image=_figure_to_base64(fig))
+
+
+def _describe_strength(r):
+    size = abs(r)
+    strength = "very strong" if size >= 0.8 else "strong" if size >= 0.6 else "moderate" if size >= 0.4 else "weak" if size >= 0.2 else "very weak"
+    return f"{strength} {'positive' if r >= 0 else 'negative'}"
+
+
+def _correlation_pair(index, a, b):
+    corr = index["correlation"]
+    if corr is None or a not in corr.columns or b not in corr.columns:
+        return None
+    r = corr.loc[a, b]
+    if pd.isna(r):
+        return None
+    text = f"The Pearson correlation between **{a}** and **{b}** is **{r:.3f}** ({_describe_strength(r)})."
+    return _answer(text, f"print(df[{a!r}].corr(df[{b!r}]))")
+
+
+def _correlation_matrix(index):
+    corr = index["correlation"]
+    if corr is None:
+        return None
+    fig = Figure(figsize=(max(6, len(corr) * 0.6), max(5, len(corr) * 0.5)))
+    ax = fig.subplots()
+    image = ax.imshow(corr.to_numpy(), cmap='coolwarm', vmin=-1, vmax=1)
+    ax.set_xticks(range(len(corr)), [str(c) for c in corr.columns], rotation=90)
+    ax.set_yticks(range(len(corr)), [str(c) for c in corr.columns])
+    fig.colorbar(image, ax=ax)
+    ax.set_title("Correlation Matrix")
+    return _answer("Here is the correlation matrix of the numeric columns.",
+                   "print(df.select_dtypes('number').corr())",
+                   image=_figure_to_base64(fig), tables=[("Correlation matrix", corr)])
+
+
+def _group_aggregate(index, agg, value_col, group_col):
+    grouped = index["group_by"].get(group_col)
+    if grouped is None or value_col not in grouped.columns.get_level_values(0):
+        return None
+    result = grouped[(value_col, agg)].rename(f"{agg} of {value_col}")
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar([str(v) for v in result.index], result.to_numpy(), color='#4e79a7')
+    ax.set_xlabel(str(group_col))
+    ax.set_ylabel(f"{agg} of {value_col}")
+    ax.set_title(f"{agg.capitalize()} of {value_col} by {group_col}")
+    fig.autofmt_xdate()
+    code = f"print(df.groupby({group_col!r})[{value_col!r}].{agg}())"
+    return _answer(f"Here is the **{agg}** of **{value_col}** for each **{group_col}**.", code,
+                   image=_figure_to_base64(fig), tables=[(f"{agg} of {value_col} by {group_col}", result)])
+
+
+AGG_PATTERN = re.compile(
+    r"\b(?P<agg>" + "|".join(AGG_ALIASES) + r")\s+(?:of\s+)?(?P<value>.+?)\s+"
+    r"(?:by|per|for each|for every|grouped by|across)\s+(?P<group>.+)$"
+)
+DISTRIBUTION_PATTERN = re.compile(r"\b(?:distribution|histogram|spread)\s+(?:of|for)\s+(?P<col>.+)$")
+CORRELATION_PAIR_PATTERN = re.compile(r"\bcorrelat\w*\s+(?:between|of)\s+(?P<a>.+?)\s+(?:and|&|vs\.?|with)\s+(?P<b>.+)$")
+CORRELATION_MATRIX_PATTERN = re.compile(r"\bcorrelation\s+(?:matrix|heatmap|table)\b|\bcorrelations\b")
+# Only whole questions about the null counts ("how many missing values are
+# there?", "which columns have nulls"); "show rows with missing values" or
+# "plot missing values" need real code
+MISSING_PATTERN = re.compile(
+    r"^(?:(?:how many|count of|number of|total|are there(?: any)?|any|check for|"
+    r"which columns (?:have|contain)|what columns (?:have|contain))\s+)?"
+    r"(?:missing|null|nan|empty)(?:\s+(?:values?|data|entries|cells)|s)?"
+    r"(?:\s+(?:are there|per column|by column|in each column|count|counts|summary))?"
+    r"(?:\s+in\s+(?:the\s+|this\s+)?(?:dataset|data|df|dataframe|table))?$"
+)
+
+
+def _memoized(index, key, fn, *args):
+    """Renders each intent (e.g. ("distribution", "Age")) only once per index."""
+    if key not in index["answers"]:
+        index["answers"][key] = fn(index, *args)
+    return index["answers"][key]
+
+
+def answer_from_index(message: str, index: dict):
+    """
+    Fast path for /chat: answers common lookup questions straight from the
+    precomputed index. Returns a ChatResponse-shaped dict whose "tables" are
+    (name, DataFrame/Series) pairs, or None if the question isn't a simple
+    lookup (the caller then falls back to the LLM).
+    """
+    text = message.strip().lower().rstrip("?.! ")
+    if set(re.findall(r"[a-z]+", text)) & ACTION_WORDS:
+        return None
+
+    columns = index["columns"]
+    match = AGG_PATTERN.search(text)
+    if match:
+        value_col = match_column(match.group("value"), columns)
+        group_col = match_column(match.group("group"), columns)
+        if value_col is not None and group_col is not None:
+            agg = AGG_ALIASES[match.group("agg")]
+            return _memoized(index, ("group_by", agg, value_col, group_col), _group_aggregate, agg, value_col, group_col)
+        return None
+
+    match = CORRELATION_PAIR_PATTERN.search(text)
+    if match:
+        a, b = match_column(match.group("a"), columns), match_column(match.group("b"), columns)
+        return _memoized(index, ("correlation", a, b), _correlation_pair, a, b) if a is not None and b is not None else None
+
+    if CORRELATION_MATRIX_PATTERN.search(text):
+        return _memoized(index, ("correlation_matrix",), _correlation_matrix)
+
+    match = DISTRIBUTION_PATTERN.search(text)
+    if match:
+        col = match_column(match.group("col"), columns)
+        return _memoized(index, ("distribution", col), _distribution, col) if col is not None else None
+
+    if MISSING_PATTERN.match(text):
+        return _memoized(index, ("missing",), _missing_values)
+    return None
@@ -1,13 +1,20 @@
+import os
+import shutil
+import tempfile
+import time
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed, dump, load
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor, GradientBoostingClassifier
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, f1_score, mean_absolute_error
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.pipeline import make_pipeline
+from app.metrics import registry, stage, timed
 
 def identify_issues(df):
     """Returns a summary of missing values and duplicates."""
@@ -47,7 +54,8 @@ def auto_encode(df):
     df = df.copy()
     encoders = {}
     for col in df.columns:
-        if df[col].dtype == 'object':
+        # pandas >= 3 stores text as the 'str' dtype rather than 'object'
+        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
             le = LabelEncoder()
             # Convert to string to handle mixed types safely
             df[col] = le.fit_transform(df[col].astype(str))
@@ -55,11 +63,95 @@ def auto_encode(df):
             
     return df, "Encoded categorical columns: " + ", ".join(encoders.keys())
 
-def find_best_model(df, target_col, problem_type=None):
+def _score_predictions(problem_type, y_true, predictions):
+    """Returns (primary score, metrics dict) for one set of predictions."""
+    metrics = {}
+    if problem_type == "regression":
+        score = r2_score(y_true, predictions)
+        metrics["R2 Score"] = score
+        metrics["MAE"] = mean_absolute_error(y_true, predictions)
+    else:
+        score = accuracy_score(y_true, predictions)
+        metrics["Accuracy"] = score
+        # Weighted F1 handles multi-class imbalances better
+        metrics["F1 Score"] = f1_score(y_true, predictions, average='weighted')
+    return score, metrics
+
+def _fit_fold(name, model, X, y, train_idx, test_idx, problem_type):
+    """
+    Fits one (model, fold) pair. Runs inside a worker process, where X is a
+    read-only memory map shared with the parent. The fit time is returned so
+    the parent can record it (worker processes have their own metrics).
+    """
+    try:
+        started = time.perf_counter()
+        model.fit(X[train_idx], y[train_idx])
+        fit_ms = (time.perf_counter() - started) * 1000
+        predictions = model.predict(X[test_idx])
+        _, metrics = _score_predictions(problem_type, y[test_idx], predictions)
+        return name, metrics, None, fit_ms
+    except Exception as e:
+        return name, None, str(e), None
+
+def _cross_validate_models(models, X, y, problem_type, cv, n_jobs):
+    """
+    Runs k-fold cross-validation for every model, spreading the
+    (model x fold) fits over a process pool.
+    Returns {model name: (list of fold metrics, error or None)}.
+    """
+    X_values = X.to_numpy()
+    y_values = y.to_numpy()
+
+    # Stratify classification folds unless a class is too rare for k folds
+    if problem_type == "classification" and y.value_counts().min() >= cv:
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=42)
+    else:
+        splitter = KFold(n_splits=cv, shuffle=True, random_state=42)
+    folds = list(splitter.split(X_values, y_values))
+
+    temp_dir = tempfile.mkdtemp(prefix="autoanalyst_cv_")
+    try:
+        # Dump X once and hand workers a memory map instead of a pickled copy
+        if X_values.dtype != object:
+            matrix_path = os.path.join(temp_dir, "X.joblib")
+            dump(X_values, matrix_path)
+            X_values = load(matrix_path, mmap_mode='r')
+
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_fold)(name, clone(model), X_values, y_values, train_idx, test_idx, problem_type)
+            for name, model in models.items()
+            for train_idx, test_idx in folds
+        )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    fold_results = {name: ([], None) for name in models}
+    for name, metrics, error, fit_ms in outputs:
+        if fit_ms is not None:
+            registry.record(f"find_best_model.cv_fit.{name}", fit_ms)
+        scores, first_error = fold_results[name]
+        if error is not None:
+            fold_results[name] = (scores, first_error or error)
+        else:
+            scores.append(metrics)
+    return fold_results
+
+@timed("find_best_model")
+def find_best_model(df, target_col, problem_type=None, cv=None, n_jobs=-1):
     """
     Runs a model tournament (Linear vs RF vs GradientBoosting) 
     and PLOTS Feature Importance.
+    
+    By default models are judged on a single 80/20 split. Pass `cv=k` to use
+    k-fold cross-validation instead: fits run in parallel (`n_jobs` processes,
+    -1 = all cores) and the table reports the mean and std of each metric.
     """
+    if cv is not None:
+        if isinstance(cv, bool) or not isinstance(cv, (int, np.integer)) or cv < 2:
+            raise ValueError(f"cv must be a whole number of folds, at least 2 (got {cv!r}); leave it out for a single 80/20 split.")
+        if cv > len(df):
+            raise ValueError(f"cv={cv} folds needs at least {cv} rows, but the data has only {len(df)}.")
+
     # 1. Setup X and y
     X = df.drop(columns=[target_col])
     y = df[target_col]
@@ -71,8 +163,6 @@ def find_best_model(df, target_col, problem_type=None):
         else:
             problem_type = "regression"
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
     results = []
     best_model = None
     best_score = -999
@@ -98,35 +188,55 @@ def find_best_model(df, target_col, problem_type=None):
         primary_metric = "Accuracy"
 
     # 4. Train and Evaluate
-    for name, model in models.items():
-        try:
-            model.fit(X_train, y_train)
-            predictions = model.predict(X_test)
-            
-            # Calculate Multiple Metrics
+    if cv:
+        # 4a. K-Fold Cross-Validation (parallel)
+        fold_results = _cross_validate_models(models, X, y, problem_type, cv, n_jobs)
+        for name, (fold_metrics, error) in fold_results.items():
+            if error is not None:
+                results.append({"Model": name, primary_metric: "Failed", "Error": error})
+                continue
             metrics = {}
-            if problem_type == "regression":
-                score = r2_score(y_test, predictions)
-                metrics["R2 Score"] = round(score, 4)
-                metrics["MAE"] = round(mean_absolute_error(y_test, predictions), 4)
-            else:
-                score = accuracy_score(y_test, predictions)
-                metrics["Accuracy"] = round(score, 4)
-                # Weighted F1 handles multi-class imbalances better
-                metrics["F1 Score"] = round(f1_score(y_test, predictions, average='weighted'), 4)
-                
-            # Add to results table
+            for metric in fold_metrics[0]:
+                values = [m[metric] for m in fold_metrics]
+                metrics[metric] = round(float(np.mean(values)), 4)
+                metrics[f"{metric} Std"] = round(float(np.std(values)), 4)
             metrics["Model"] = name
+            metrics["Folds"] = cv
             results.append(metrics)
-            
-            # Track Winner
-            if score > best_score:
-                best_score = score
-                best_model = model
+
+            if metrics[primary_metric] > best_score:
+                best_score = metrics[primary_metric]
                 best_model_name = name
+
+        # Refit the winner on all the data for the feature importance plot
+        if best_model_name:
+            with stage(f"find_best_model.refit.{best_model_name}"):
+                best_model = models[best_model_name].fit(X, y)
+    else:
+        # 4b. Single Train/Test Split
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        for name, model in models.items():
+            try:
+                with stage(f"find_best_model.fit.{name}"):
+                    model.fit(X_train, y_train)
+                predictions = model.predict(X_test)
+                
+                # Calculate Multiple Metrics
+                score, metrics = _score_predictions(problem_type, y_test, predictions)
+                metrics = {k: round(v, 4) for k, v in metrics.items()}
+                    
+                # Add to results table
+                metrics["Model"] = name
+                results.append(metrics)
                 
-        except Exception as e:
-            results.append({"Model": name, primary_metric: "Failed", "Error": str(e)})
+                # Track Winner
+                if score > best_score:
+                    best_score = score
+                    best_model = model
+                    best_model_name = name
+                    
+            except Exception as e:
+                results.append({"Model": name, primary_metric: "Failed", "Error": str(e)})
 
     # 5. Generate Feature Importance Plot
     plt.figure(figsize=(10, 6))
@@ -1,15 +1,254 @@
 import sys
 import io
+import ast
+import builtins
+import itertools
+import copy
+import hashlib
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import matplotlib
 import matplotlib.pyplot as plt
 import base64
 import traceback
 from app.automl import identify_issues, auto_clean, auto_encode, find_best_model
+from app.versioning import DatasetHistory, COPY_ON_WRITE
+from app.metrics import stage, timed
 
 # Set non-interactive backend to prevent plots from popping up on the server
 matplotlib.use('Agg') 
 
+# --- Table capture configuration ---
+MAX_TABLES_PER_RUN = 20   # Further DataFrames in one run are printed as text
+MAX_STORED_TABLES = 32    # Recent tables kept for paging via /tables/{id}...
+MAX_STORED_TABLE_BYTES = 128 * 1024 * 1024  # ...as long as they add up to at most 128 MB
+
+# --- Result cache configuration ---
+CACHE_MAX_ENTRIES = 128
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB of cached outputs + bindings
+
+# Code touching any of these is never cached (I/O, randomness, clock, introspection)
+IMPURE_NAMES = {
+    "open", "input", "exec", "eval", "compile", "globals", "locals", "vars",
+    "setattr", "delattr", "__import__"
+}
+IMPURE_MODULES = {
+    "random", "time", "datetime", "os", "sys", "subprocess", "shutil",
+    "socket", "requests", "pathlib", "secrets", "uuid", "tempfile"
+}
+IMPURE_ATTRIBUTES = {"random", "now", "today", "utcnow"}
+# Calls that draw random numbers: only cacheable with an explicit seed
+SEEDED_CALLS = {
+    "sample", "shuffle", "permutation", "train_test_split",
+    "ShuffleSplit", "StratifiedShuffleSplit", "GroupShuffleSplit"
+}
+SEED_KEYWORDS = {"random_state", "seed", "rng"}
+# Methods that mutate their receiver even without `inplace=True`
+MUTATING_METHODS = {
+    "append", "extend", "insert", "remove", "pop", "clear", "update",
+    "setdefault", "add", "discard", "sort", "reverse",
+    "fit", "fit_transform", "partial_fit", "savefig", "to_csv", "to_excel"
+}
+
+_MISSING = object()
+
+
+def _is_unseeded_random_call(call: ast.Call) -> bool:
+    """df.sample(3), train_test_split(X, y), KFold(shuffle=True), ... without a fixed seed."""
+    func = call.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+    keywords = {kw.arg: kw.value for kw in call.keywords}
+    seed = next((keywords[k] for k in SEED_KEYWORDS if k in keywords), None)
+    if seed is not None and not (isinstance(seed, ast.Constant) and seed.value is None):
+        return False
+    shuffle = keywords.get("shuffle")
+    if shuffle is not None:
+        # e.g. KFold(shuffle=True) / train_test_split(..., shuffle=False)
+        return not (isinstance(shuffle, ast.Constant) and shuffle.value is False)
+    return name in SEEDED_CALLS
+
+
+def _is_side_effect_free(tree: ast.AST) -> bool:
+    """
+    Static check: True if the code only reads its inputs and binds new names.
+    Rebinding of inputs is checked at runtime (see `CodeExecutor.execute_code`).
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Delete, ast.Global, ast.Nonlocal)):
+            return False
+        if isinstance(node, (ast.Subscript, ast.Attribute)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            return False  # df['x'] = ..., obj.attr = ...
+        if isinstance(node, ast.Name) and node.id in IMPURE_NAMES:
+            return False
+        if isinstance(node, ast.Attribute) and node.attr in IMPURE_ATTRIBUTES:
+            return False
+        if isinstance(node, ast.Import) and any(a.name.split(".")[0] in IMPURE_MODULES for a in node.names):
+            return False
+        if isinstance(node, ast.ImportFrom) and (node.module or "").split(".")[0] in IMPURE_MODULES:
+            return False
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Attribute) and node.func.attr in MUTATING_METHODS:
+                return False
+            if _is_unseeded_random_call(node):
+                return False
+            for kw in node.keywords:
+                if kw.arg == "inplace" and not (isinstance(kw.value, ast.Constant) and kw.value.value is False):
+                    return False
+    return True
+
+
+def _input_names(tree: ast.AST) -> set:
+    """
+    Names the code reads before assigning them itself, i.e. its inputs from
+    the namespace. Walks nodes in (roughly) evaluation order.
+    """
+    assigned, inputs = set(), set()
+
+    def visit(node):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                if node.id not in assigned:
+                    inputs.add(node.id)
+            else:
+                assigned.add(node.id)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.NamedExpr)):
+            # The right-hand side is evaluated before the targets are bound
+            if node.value is not None:
+                visit(node.value)
+            if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+                if node.target.id not in assigned:
+                    inputs.add(node.target.id)  # `x += 1` also reads x
+            for target in (node.targets if isinstance(node, ast.Assign) else [node.target]):
+                visit(target)
+        elif isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            # Comprehension variables live in their own scope
+            outer = set(assigned)
+            for generator in node.generators:
+                visit(generator.iter)
+                visit(generator.target)
+                for condition in generator.ifs:
+                    visit(condition)
+            for field in ("elt", "key", "value"):
+                if hasattr(node, field):
+                    visit(getattr(node, field))
+            assigned.intersection_update(outer)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+                visit(default)
+            outer = set(assigned)
+            assigned.update(a.arg for a in ast.walk(node.args) if isinstance(a, ast.arg))
+            for child in (node.body if isinstance(node.body, list) else [node.body]):
+                visit(child)
+            assigned.intersection_update(outer)
+            if not isinstance(node, ast.Lambda):
+                assigned.add(node.name)
+        else:
+            for child in ast.iter_child_nodes(node):
+                visit(child)
+
+    visit(tree)
+    return inputs
+
+
+def _fingerprint_value(value):
+    """
+    Hashable fingerprint of a namespace input, or None if it can't be
+    fingerprinted cheaply (which makes the code uncacheable).
+    """
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return (type(value).__name__, value)
+    if isinstance(value, tuple):
+        parts = tuple(_fingerprint_value(v) for v in value)
+        return None if any(p is None for p in parts) else ("tuple", parts)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        try:
+            row_hashes = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        except TypeError:
+            return None  # unhashable cells (lists, dicts, ...)
+        columns = tuple(map(str, value.columns)) if isinstance(value, pd.DataFrame) else (str(value.name),)
+        return (type(value).__name__, columns, hashlib.sha1(row_hashes.tobytes()).hexdigest())
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return ("ndarray", value.shape, str(value.dtype), hashlib.sha1(value.tobytes()).hexdigest())
+    return None
+
+
+def _snapshot_binding(value):
+    """Private copy of a value bound by cached code, so later edits can't leak into the cache."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not COPY_ON_WRITE)  # Copy-on-Write keeps this cheap
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def _estimate_nbytes(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=False)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_estimate_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ExecutionCache:
+    """
+    LRU cache of execution results, bounded by entry count and bytes.
+    Entries remember which `df` version they were computed on so they can be
+    dropped when that version leaves the history.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (result, bindings, df_version, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, result: dict, bindings: dict, df_version):
+        nbytes = sum(_estimate_nbytes(v) for v in result.values() if v)
+        nbytes += sum(_estimate_nbytes(v) for v in bindings.values())
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (result, bindings, df_version, nbytes)
+        self.total_bytes += nbytes
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def discard_versions(self, version_ids):
+        """Drops entries computed on dataset versions that no longer exist."""
+        version_ids = set(version_ids)
+        for key in [k for k, e in self._entries.items() if e[2] in version_ids]:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        self.total_bytes -= self._entries.pop(key)[3]
+
+
 class CodeExecutor:
     def __init__(self):
         # We inject the tools into 'globals' so the LLM can call them directly
@@ -19,14 +258,175 @@ class CodeExecutor:
             "identify_issues": identify_issues,
             "auto_clean": auto_clean,
             "auto_encode": auto_encode,
-            "find_best_model": find_best_model
+            "find_best_model": find_best_model,
+            # DataFrames/Series passed to these are returned as tables, not text
+            "print": self._print,
+            "display": self._display
         }
         self.locals = {}
+        self.tables = OrderedDict()  # table_id -> {"table_id", "name", "frame"}
+        self._table_bytes = {}       # table_id -> estimated size of its frame
+        self._table_ids = itertools.count(1)
+        self._captured_tables = None  # list while code is running
+        # Every change to `df` is recorded here (shares unchanged columns)
+        self.history = DatasetHistory()
+        # Outputs of side-effect-free code, keyed by code + inputs
+        self.cache = ExecutionCache()
+        self.history.on_evict = self.cache.discard_versions
+        # True while `df` couldn't be recorded in the history: its version id
+        # then doesn't describe it, so results that read `df` aren't cached
+        self._df_unversioned = False
+
+    def load_dataset(self, df: pd.DataFrame):
+        """Sets a freshly uploaded dataset as `df` and restarts its history."""
+        self.locals['df'] = df
+        self.history.reset(df)
+        self.cache.clear()
+        self._df_unversioned = False
+
+    def get_table(self, table_id: str) -> dict:
+        """Returns a captured table by id (KeyError once it's been evicted)."""
+        return self.tables[table_id]
 
+    def register_table(self, obj, name: str) -> dict:
+        """Stores a table produced outside executed code (e.g. the /chat fast path) for paging."""
+        table = {"table_id": f"t{next(self._table_ids)}", "name": name, "frame": obj}
+        self._remember_table(table)
+        return table
+
+    def _remember_table(self, table: dict):
+        """
+        Keeps a table pageable. Bounded by count and bytes: a captured frame can
+        share buffers with `df` versions the history has already dropped (or be
+        a full copy of the dataset), so old tables mustn't pile up. The newest
+        table is always kept.
+        """
+        self.tables[table["table_id"]] = table
+        self.tables.move_to_end(table["table_id"])
+        self._table_bytes[table["table_id"]] = _estimate_nbytes(table["frame"])
+        while len(self.tables) > 1 and (len(self.tables) > MAX_STORED_TABLES
+                                        or sum(self._table_bytes.values()) > MAX_STORED_TABLE_BYTES):
+            table_id, _ = self.tables.popitem(last=False)
+            del self._table_bytes[table_id]
+
+    def _capture_table(self, obj, name: str = None):
+        """
+        Stores a DataFrame/Series produced by the code and returns the short
+        placeholder printed in its place. Returns None if capture isn't possible.
+        """
+        if self._captured_tables is None or len(self._captured_tables) >= MAX_TABLES_PER_RUN:
+            return None
+        table_id = f"t{next(self._table_ids)}"
+        name = name or f"Table {len(self._captured_tables) + 1}"
+        # Shallow copy under Copy-on-Write: later edits to the object won't change the table
+        table = {"table_id": table_id, "name": name, "frame": obj.copy(deep=not COPY_ON_WRITE)}
+        self._captured_tables.append(table)
+        self._remember_table(table)
+        rows, cols = (len(obj), 1) if isinstance(obj, pd.Series) else obj.shape
+        return f"[{name}: {rows} rows x {cols} columns]"
+
+    def _print(self, *args, sep=' ', end='\n', file=None, flush=False):
+        """print() replacement for executed code: DataFrames/Series become table attachments."""
+        if file is None or file is sys.stdout:
+            args = [
+                (self._capture_table(a) or a) if isinstance(a, (pd.DataFrame, pd.Series)) else a
+                for a in args
+            ]
+        builtins.print(*args, sep=sep, end=end, file=file, flush=flush)
+
+    def _display(self, obj, name: str = None):
+        """Notebook-style display(): captures tables, prints anything else."""
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            placeholder = self._capture_table(obj, name=name)
+            if placeholder:
+                builtins.print(placeholder)
+                return
+        builtins.print(obj)
+
+    def _run(self, code: str, tree):
+        """
+        exec()s the code. If the last statement is a bare expression that
+        evaluates to a DataFrame/Series (e.g. `df.describe()`), it is captured
+        as a table, like a notebook cell would display it.
+        """
+        if tree is None or not tree.body or not isinstance(tree.body[-1], ast.Expr):
+            exec(code, self.globals, self.locals)
+            return
+        last = tree.body[-1]
+        exec(compile(ast.Module(body=tree.body[:-1], type_ignores=[]), "<string>", "exec"), self.globals, self.locals)
+        value = eval(compile(ast.Expression(last.value), "<string>", "eval"), self.globals, self.locals)
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            self._capture_table(value, name=ast.get_source_segment(code, last.value))
+
+    def _df_version(self):
+        current = self.history.current
+        return current.version_id if current is not None else None
+
+    def _cache_key(self, tree: ast.AST):
+        """
+        (normalized code, fingerprint of every local the code reads).
+        `df` is fingerprinted by its history version instead of its contents.
+        Returns None if some input can't be fingerprinted.
+        """
+        fingerprint = []
+        for name in sorted(_input_names(tree)):
+            value = self.locals.get(name, _MISSING)
+            if value is _MISSING:
+                # Tools/modules from globals are fixed; unknown names only matter once defined
+                fingerprint.append((name, "global" if name in self.globals else "missing"))
+            elif name == 'df' and isinstance(value, pd.DataFrame):
+                if self._df_unversioned:
+                    return None
+                fingerprint.append((name, "df-version", self._df_version()))
+            else:
+                value_fp = _fingerprint_value(value)
+                if value_fp is None:
+                    return None
+                fingerprint.append((name, value_fp))
+        # ast.dump ignores formatting and comments
+        return (ast.dump(tree), tuple(fingerprint))
+
+    def rollback(self, version_id: int) -> pd.DataFrame:
+        """
+        Restores `df` to an earlier version from the history.
+        Cached results for the dropped versions are discarded via `on_evict`.
+        """
+        df = self.history.rollback(version_id)
+        self.locals['df'] = df
+        self._df_unversioned = False
+        return df
+
+    @timed("execute_code")
     def execute_code(self, code: str):
         """
-        Executes Python code, captures stdout, and intercepts matplotlib plots.
+        Executes Python code, captures stdout, DataFrame/Series results
+        (as tables) and intercepts matplotlib plots.
+        Side-effect-free code that already ran on the same inputs is answered
+        from the result cache instead of being executed again.
         """
+        # 0. Look up the result cache
+        cache_key = None
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            tree = None  # Let exec() report the error below
+        if tree is not None and _is_side_effect_free(tree):
+            cache_key = self._cache_key(tree)
+        if cache_key is not None:
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                with stage("execute_code.cache_hit"):
+                    result, bindings, _, _ = entry
+                    for name, value in bindings.items():
+                        self.locals[name] = _snapshot_binding(value)
+                    # Make the cached tables pageable again
+                    for table in result["tables"]:
+                        self._remember_table(table)
+                return {**result, "cached": True}
+
+        df_version_before = self._df_version()
+        locals_before = dict(self.locals)
+
         # 1. Capture Standard Output (print statements)
         old_stdout = sys.stdout
         redirected_output = io.StringIO()
@@ -34,18 +434,22 @@ class CodeExecutor:
 
         image_base64 = None
         error_message = None
+        self._captured_tables = []
 
         try:
             # 2. Execute the code within the persistent context
-            exec(code, self.globals, self.locals)
+            with stage("execute_code.exec"):
+                self._run(code, tree)
 
             # 3. Check if a plot was generated
             if plt.get_fignums():
                 img_buffer = io.BytesIO()
-                plt.savefig(img_buffer, format='png', bbox_inches='tight')
+                with stage("execute_code.savefig"):
+                    plt.savefig(img_buffer, format='png', bbox_inches='tight')
                 img_buffer.seek(0)
                 # Convert to base64 so we can send it as JSON
-                image_base64 = base64.b64encode(img_buffer.read()).decode('utf-8')
+                with stage("execute_code.base64"):
+                    image_base64 = base64.b64encode(img_buffer.read()).decode('utf-8')
                 plt.close('all') # Clear plot for next time
 
         except Exception:
@@ -55,13 +459,57 @@ class CodeExecutor:
         finally:
             # Restore stdout
             sys.stdout = old_stdout
+            tables, self._captured_tables = self._captured_tables, None
+
+        # Record the new state of `df` (no-op if the code didn't change it).
+        # Done even on errors, since the code may have modified `df` before failing.
+        # A failure here must not fail the execution (or every later one).
+        with stage("execute_code.version_commit"):
+            try:
+                self.history.commit(self.locals.get('df'), label=code)
+                self._df_unversioned = False
+            except Exception as e:
+                print(f"Could not record a dataset version: {e!r}")
+                self._df_unversioned = True
 
-        return {
+        result = {
             "text_output": redirected_output.getvalue(),
             "image_output": image_base64,
-            "error": error_message
+            "error": error_message,
+            # [{"table_id", "name", "frame"}]; encoded per request by the API
+            "tables": tables
         }
 
+        if cache_key is not None and error_message is None:
+            self._store_in_cache(cache_key, tree, result, locals_before, df_version_before)
+
+        return {**result, "cached": False}
+
+    def _store_in_cache(self, cache_key, tree, result, locals_before, df_version_before):
+        """
+        Caches the result if the run really had no side effects: `df` kept its
+        version and no input the code read was rebound. Newly bound names are
+        stored so a cache hit can restore them.
+        """
+        if self._df_version() != df_version_before:
+            return
+        inputs = _input_names(tree)
+        bindings = {}
+        for name, value in self.locals.items():
+            if locals_before.get(name, _MISSING) is value:
+                continue
+            if name == 'df':
+                continue  # Rebound to an identical copy (version unchanged)
+            if name in inputs:
+                return
+            try:
+                bindings[name] = _snapshot_binding(value)
+            except Exception:
+                return  # Can't safely keep a copy of this value
+        if any(name not in self.locals for name in locals_before):
+            return
+        self.cache.put(cache_key, result, bindings, df_version_before)
+
 # Create a singleton instance for Phase 2 simplicity
 # (In Phase 3/4, we would manage multiple sessions)
 session_executor = CodeExecutor()
\ No newline at end of file
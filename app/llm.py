@@ -1,30 +1,18 @@
-import google.generativeai as genai
-import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file (before the client reads them)
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
-# Configure the API Key from environment variable
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set. Please set it before running the application.")
+from app import llm_client
+from app.metrics import stage
 
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    # List available models for debugging
-    available_models = [m.name for m in genai.list_models()]
-    print("\n=== Available Gemini Models ===")
-    for model in available_models:
-        print(f"- {model}")
-    print("===========================\n")
-except Exception as e:
-    print(f"Error initializing Gemini: {e}")
-    raise
+# Build the shared client now so a missing GEMINI_API_KEY fails at startup.
+# Set AUTOANALYST_LLM_BACKEND=fake (or call llm_client.set_backend) to run without Gemini.
+llm_client.get_client()
 
-def generate_code_from_query(query: str, columns: list, summary: dict) -> str:
+async def generate_code_from_query(query: str, columns: list, summary: dict) -> str:
     prompt = f"""
     You are an expert Python Data Scientist Assistant.
     
@@ -36,6 +24,7 @@ def generate_code_from_query(query: str, columns: list, summary: dict) -> str:
     2. `df, log = auto_clean(df)` -> Automatically fills missing values and drops duplicates.
     3. `df, log = auto_encode(df)` -> Encodes text columns to numbers (REQUIRED before ML).
     4. `results, msg = find_best_model(df, target_col='Price')` -> Trains models and returns a comparison table.
+       Add `cv=5` for k-fold cross-validation (mean/std per metric) when the user asks for a robust or reliable comparison.
     
     DATASET METADATA:
     - Columns: {columns}
@@ -55,39 +44,28 @@ def generate_code_from_query(query: str, columns: list, summary: dict) -> str:
        b) Run `results, msg = find_best_model(df, target_col='...')`
        c) Print the `results` and `msg`.
     4. ALWAYS print the output variables so the user can see them.
+       Print DataFrames/Series directly (e.g. `print(results)`, `print(df.describe())`); they are shown as interactive tables, so never convert them to strings.
     5. RESPOND ONLY WITH CODE.
     """
 
-    # 2. Call Gemini
+    # 2. Call the LLM (timeouts, retries and coalescing live in llm_client)
     try:
-        # Use the specified Gemini 2.5 Flash model
-        model_name = 'gemini-2.5-flash'
-        print(f"Using model: {model_name}")
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        
-        if not response or not hasattr(response, 'text'):
-            raise Exception("No valid response received from the model")
+        with stage("llm.generate_code"):
+            text = await llm_client.get_client().generate(prompt)
             
         # 3. Clean the output
         # Gemini might still wrap code in ```python ... ```. We strip that.
-        code = response.text.replace("```python", "").replace("```", "").strip()
+        code = text.replace("```python", "").replace("```", "").strip()
         
         return code
         
     except Exception as e:
-        print("\n=== Gemini API Error ===")
-        print(f"Error: {str(e)}")
-        print("Available models:")
-        try:
-            for m in genai.list_models():
-                print(f"- {m.name}")
-        except Exception as list_error:
-            print(f"Could not list models: {list_error}")
+        print("\n=== LLM API Error ===")
+        print(f"Error: {e!r}")
         print("======================\n")
         raise
 
-def analyze_dataset(columns: list, summary: dict, first_rows: list) -> str:
+async def analyze_dataset(columns: list, summary: dict, first_rows: list) -> str:
     """
     Analyzes the uploaded data and generates a 'Welcome Message' 
     suggesting what the AutoAnalyst can do.
@@ -120,8 +98,7 @@ def analyze_dataset(columns: list, summary: dict, first_rows: list) -> str:
     """
     
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
+        with stage("llm.analyze_dataset"):
+            return await llm_client.get_client().generate(prompt)
     except Exception as e:
         return f"I've loaded your data, but I couldn't generate an analysis. Error: {e}"
\ No newline at end of file
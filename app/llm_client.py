@@ -0,0 +1,208 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+
+# --- Configuration (environment variables) ---
+LLM_BACKEND = os.getenv("AUTOANALYST_LLM_BACKEND", "gemini")  # "gemini" or "fake"
+LLM_MODEL = os.getenv("AUTOANALYST_LLM_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT = float(os.getenv("AUTOANALYST_LLM_TIMEOUT", "60"))          # seconds per attempt
+LLM_DEADLINE = float(os.getenv("AUTOANALYST_LLM_DEADLINE", "120"))       # seconds for all attempts
+LLM_MAX_RETRIES = int(os.getenv("AUTOANALYST_LLM_MAX_RETRIES", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("AUTOANALYST_LLM_MAX_CONCURRENCY", "4"))
+RETRY_BASE_DELAY = 0.5  # seconds; doubles every attempt (with full jitter)
+RETRY_MAX_DELAY = 8.0
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a prompt couldn't be answered before its deadline."""
+
+
+# ------------------------------------------------------------------
+# Backends
+# ------------------------------------------------------------------
+class LLMBackend:
+    """Interface: turns a prompt into text. Implementations must be async."""
+    name = "base"
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        # Programming errors won't fix themselves on retry
+        return not isinstance(error, (ValueError, TypeError, NotImplementedError))
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google-generativeai's async API."""
+    name = "gemini"
+
+    def __init__(self, model_name: str = LLM_MODEL, api_key: str = None):
+        import google.generativeai as genai
+
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set. Please set it before running the application.")
+
+        try:
+            genai.configure(api_key=api_key)
+            # List available models for debugging
+            available_models = [m.name for m in genai.list_models()]
+            print("\n=== Available Gemini Models ===")
+            for model in available_models:
+                print(f"- {model}")
+            print("===========================\n")
+        except Exception as e:
+            print(f"Error initializing Gemini: {e}")
+            raise
+
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        if not response or not hasattr(response, 'text'):
+            raise Exception("No valid response received from the model")
+        return response.text
+
+    def is_retryable(self, error: Exception) -> bool:
+        try:
+            from google.api_core import exceptions as google_errors
+        except ImportError:
+            return super().is_retryable(error)
+        # Rate limits, overload and transient server errors are worth retrying;
+        # bad requests, auth problems and unknown models are not.
+        if isinstance(error, (google_errors.InvalidArgument, google_errors.PermissionDenied,
+                              google_errors.Unauthenticated, google_errors.NotFound)):
+            return False
+        return super().is_retryable(error)
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic local backend for tests and benchmarks.
+    `responder(prompt) -> str` produces the answer; `latency` simulates
+    network time.
+    """
+    name = "fake"
+
+    def __init__(self, responder=None, latency: float = 0.0):
+        self.responder = responder or (lambda prompt: "print(df.head())")
+        self.latency = latency
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.responder(prompt)
+
+
+# ------------------------------------------------------------------
+# Client
+# ------------------------------------------------------------------
+class LLMClient:
+    """
+    Wraps a backend with:
+    - a timeout per attempt and an overall deadline per call,
+    - retries with exponential backoff and full jitter,
+    - a global concurrency limit (semaphore),
+    - single-flight coalescing: identical prompts that are already in flight
+      share one backend call instead of each sending their own.
+    """
+    def __init__(self, backend: LLMBackend, timeout: float = LLM_TIMEOUT, deadline: float = LLM_DEADLINE,
+                 max_retries: int = LLM_MAX_RETRIES, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.backend = backend
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._in_flight = {}  # prompt hash -> asyncio.Task
+        self.stats = {"calls": 0, "coalesced": 0, "backend_calls": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+    async def generate(self, prompt: str) -> str:
+        self.stats["calls"] += 1
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._generate_with_retries(prompt))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # shield(): one caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _generate_with_retries(self, prompt: str) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                self.stats["timeouts"] += 1
+                raise LLMTimeoutError(f"LLM call exceeded its {self.deadline:.1f}s deadline")
+            try:
+                async with self._semaphore:
+                    self.stats["backend_calls"] += 1
+                    return await asyncio.wait_for(self.backend.generate(prompt), min(self.timeout, remaining))
+            except asyncio.TimeoutError as e:
+                self.stats["timeouts"] += 1
+                error = LLMTimeoutError(f"LLM call timed out after {min(self.timeout, remaining):.1f}s")
+                error.__cause__ = e
+                retryable = True
+            except Exception as e:
+                error = e
+                retryable = self.backend.is_retryable(e)
+
+            if not retryable or attempt >= self.max_retries:
+                self.stats["failures"] += 1
+                raise error
+
+            # Full jitter: sleep a random time up to the exponential backoff cap
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if time.monotonic() + delay >= give_up_at:
+                self.stats["failures"] += 1
+                raise error
+            attempt += 1
+            self.stats["retries"] += 1
+            print(f"LLM call failed ({error!r}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+# ------------------------------------------------------------------
+# Process-wide client
+# ------------------------------------------------------------------
+_client = None
+
+
+def build_backend(name: str = LLM_BACKEND) -> LLMBackend:
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend '{name}' (expected 'gemini' or 'fake')")
+
+
+def get_client() -> LLMClient:
+    """Returns the shared client, building it from the environment on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(build_backend())
+    return _client
+
+
+def set_backend(backend: LLMBackend, **client_options) -> LLMClient:
+    """
+    Swaps the backend (e.g. a FakeBackend in tests).
+    Calling it before `app.llm` is imported avoids initialising Gemini at all.
+    """
+    global _client
+    _client = LLMClient(backend, **client_options)
+    return _client
@@ -1,10 +1,14 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Request, UploadFile, HTTPException
+from typing import List, Optional
 # Import necessary services and schemas
-from app.services import save_file_locally, load_and_preview_data, read_dataset
+from app.services import save_file_locally, load_and_preview_data, read_dataset, remove_dataset_files
 from app.executor import session_executor
 from app.llm import generate_code_from_query, analyze_dataset
-from app.schemas import ResponseModel, CodeRequest, CodeResponse, ChatRequest, ChatResponse
-import os
+from app import metrics, llm_client
+from app.schemas import TableFormat, ResponseModel, CodeRequest, CodeResponse, ChatRequest, ChatResponse, DatasetVersionInfo, DatasetDiff, TableAttachment
+from app.tables import encode_table
+from app.aggregates import build_aggregate_index, answer_from_index
+import time
 import uvicorn
 
 app = FastAPI(title="Data Scientist Assistant Backend")
@@ -12,21 +16,56 @@ app = FastAPI(title="Data Scientist Assistant Backend")
 # Global dictionary to store metadata in memory
 # This acts as a simple "Brain Memory" so the LLM knows what columns exist.
 METADATA_STORE = {} 
+# Precomputed aggregates per file (histograms, nulls, correlations, group-bys)
+# so common questions can be answered without the LLM or exec().
+AGGREGATE_INDEX = {}
+
+@app.middleware("http")
+async def record_request_timings(request: Request, call_next):
+    """
+    Times every request and collects the stages it ran (see app/metrics.py).
+    Adds a `Server-Timing` header when enabled globally or when the client
+    sends `X-Request-Timing: 1`.
+    """
+    stages = metrics.begin_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    total_ms = (time.perf_counter() - started) * 1000
+
+    if metrics.TIMING_HEADERS or request.headers.get("X-Request-Timing") == "1":
+        response.headers["Server-Timing"] = metrics.server_timing_header(stages, total_ms)
+
+    # Use the route template (e.g. /versions/{version_id}/rollback) to keep names bounded
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.registry.record(f"http {request.method} {path}", total_ms)
+    return response
 
 @app.post("/upload", response_model=ResponseModel)
-async def upload_dataset(file: UploadFile = File(...)):
+async def upload_dataset(
+    file: UploadFile = File(...),
+    sheet_name: Optional[str] = Form(None),  # Excel only: sheet name or index ("0" = first)
+    columns: Optional[str] = Form(None)      # Comma-separated subset of columns to load
+):
     file_path, file_id = save_file_locally(file)
     
     try:
-        # 1. Generate Metadata
-        preview_data = load_and_preview_data(file_path, file.filename, file.content_type)
+        # 1. Generate Metadata (this parses the file once and caches it as Parquet)
+        preview_data = load_and_preview_data(
+            file_path, file.filename, file.content_type,
+            sheet_name=sheet_name, usecols=columns
+        )
         
-        # 2. Load into Session
-        df = read_dataset(file_path)
-        session_executor.locals['df'] = df
+        # 2. Load into Session (served from the columnar cache)
+        df = read_dataset(file_path, sheet_name=sheet_name, usecols=columns)
+        session_executor.load_dataset(df)
+        with metrics.stage("aggregate_index.build"):
+            AGGREGATE_INDEX[file_id] = build_aggregate_index(
+                df, version_id=session_executor.history.current.version_id
+            )
         
         # 3. NEW: Generate the Chat Explanation
-        ai_welcome_message = analyze_dataset(
+        ai_welcome_message = await analyze_dataset(
             preview_data['columns'],
             preview_data['summary_stats'],
             preview_data['first_rows']
@@ -45,10 +84,25 @@ async def upload_dataset(file: UploadFile = File(...)):
             "description": ai_welcome_message # <--- Send it back
         }
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        remove_dataset_files(file_path)
         raise e
 
+def encode_tables(execution_result: dict, table_format: str):
+    """
+    Turns the DataFrames captured by the executor into columnar attachments.
+    Returns (attachments, text): a table that can't be encoded is sent as
+    text instead, so one odd result doesn't fail the whole response.
+    """
+    attachments, text = [], ""
+    with metrics.stage("encode_tables"):
+        for t in execution_result["tables"]:
+            try:
+                attachments.append(encode_table(t["table_id"], t["name"], t["frame"], fmt=table_format))
+            except Exception as e:
+                print(f"Sending table {t['table_id']} as text: {e}")
+                text += f"\n{t['name']}:\n{t['frame']}\n"
+    return attachments, text
+
 @app.post("/execute", response_model=CodeResponse)
 async def execute_python(request: CodeRequest):
     """
@@ -56,7 +110,8 @@ async def execute_python(request: CodeRequest):
     Used by the LLM (or for testing purposes).
     """
     result = session_executor.execute_code(request.code)
-    return result
+    tables, tables_text = encode_tables(result, request.table_format)
+    return {**result, "text_output": result["text_output"] + tables_text, "tables": tables}
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_data(request: ChatRequest):
@@ -66,6 +121,7 @@ async def chat_with_data(request: ChatRequest):
     2. Uses Gemini to write the Python code.
     3. Executes the code.
     4. Returns the result (text + image).
+    Common lookups are answered from the precomputed aggregate index instead.
     """
     
     # 1. Retrieve Metadata
@@ -73,10 +129,25 @@ async def chat_with_data(request: ChatRequest):
         raise HTTPException(status_code=404, detail="File metadata not found. Please upload file first.")
         
     metadata = METADATA_STORE[request.file_id]
+
+    # 2. Fast Path: answer lookups ("distribution of X", "mean of X by Y", ...)
+    # from the precomputed index, as long as `df` hasn't changed since upload
+    index = AGGREGATE_INDEX.get(request.file_id)
+    current = session_executor.history.current
+    if index is not None and current is not None and index["version_id"] == current.version_id:
+        with metrics.stage("chat.fast_path"):
+            answer = answer_from_index(request.message, index)
+            if answer is not None:
+                answer = dict(answer)  # The index keeps the original
+                tables = [session_executor.register_table(obj, name) for name, obj in answer["tables"]]
+                answer["tables"], tables_text = encode_tables({"tables": tables}, request.table_format)
+                answer["response_text"] += tables_text
+                answer["generated_code"] = "# Answered from the precomputed index (equivalent code):\n" + answer["generated_code"]
+                return answer
     
-    # 2. Get Python Code from Gemini
+    # 3. Get Python Code from Gemini
     try:
-        generated_code = generate_code_from_query(
+        generated_code = await generate_code_from_query(
             query=request.message,
             columns=metadata['columns'],
             summary=metadata['summary']
@@ -84,10 +155,10 @@ async def chat_with_data(request: ChatRequest):
     except Exception as e:
          raise HTTPException(status_code=500, detail=f"LLM Error: {str(e)}")
 
-    # 3. Execute the Code
+    # 4. Execute the Code
     execution_result = session_executor.execute_code(generated_code)
     
-    # 4. Handle Execution Errors (if the AI wrote bad code)
+    # 5. Handle Execution Errors (if the AI wrote bad code)
     if execution_result['error']:
         return {
             "response_text": f"I tried to run the code, but ran into an error:\n{execution_result['error']}",
@@ -95,12 +166,83 @@ async def chat_with_data(request: ChatRequest):
             "image_output": None
         }
         
-    # 5. Return Success
+    # 6. Return Success (DataFrames/Series come back as tables, not text)
+    tables, tables_text = encode_tables(execution_result, request.table_format)
+    response_text = execution_result['text_output'] + tables_text
+    if not response_text.strip():
+        # Nothing printed: point at whatever the code did produce
+        if tables:
+            response_text = "Here are the results (see the table below)." if len(tables) == 1 else f"Here are the results ({len(tables)} tables below)."
+        elif execution_result['image_output']:
+            response_text = "Done! (Check the plot)"
+        else:
+            response_text = "Done! The code ran without producing any output."
     return {
-        "response_text": execution_result['text_output'] or "Done! (Check the plot)",
+        "response_text": response_text,
         "generated_code": generated_code,
-        "image_output": execution_result['image_output']
+        "image_output": execution_result['image_output'],
+        "tables": tables
+    }
+
+@app.get("/tables/{table_id}", response_model=TableAttachment)
+async def get_table_page(table_id: str, offset: int = 0, limit: Optional[int] = None, table_format: TableFormat = "json"):
+    """
+    Pages through a table captured by an earlier /execute or /chat call
+    (only the first page is sent inline).
+    """
+    try:
+        table = session_executor.get_table(table_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Table not found (it may have been evicted).")
+    try:
+        return encode_table(table_id, table["name"], table["frame"], fmt=table_format, offset=max(offset, 0), limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Table can't be encoded: {e}")
+
+@app.get("/versions", response_model=List[DatasetVersionInfo])
+async def list_versions():
+    """
+    Lists the recorded versions of `df` (oldest first).
+    A new version is recorded whenever executed code changes the data.
+    """
+    return session_executor.history.list_versions()
+
+@app.get("/versions/diff", response_model=DatasetDiff)
+async def diff_versions(from_version: int, to_version: int):
+    """Shows which columns/rows changed between two versions."""
+    try:
+        return session_executor.history.diff(from_version, to_version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/versions/{version_id}/rollback", response_model=DatasetVersionInfo)
+async def rollback_version(version_id: int):
+    """Undo: restores `df` to the given version and drops newer ones."""
+    try:
+        session_executor.rollback(version_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return session_executor.history.list_versions()[-1]
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Per-stage latency/resource stats since startup, plus executor cache and
+    dataset history usage.
+    """
+    snapshot = metrics.registry.snapshot()
+    snapshot["execution_cache"] = {
+        "entries": len(session_executor.cache),
+        "bytes": session_executor.cache.total_bytes,
+        "hits": session_executor.cache.hits,
+        "misses": session_executor.cache.misses
+    }
+    snapshot["llm"] = {"backend": llm_client.get_client().backend.name, **llm_client.get_client().stats}
+    snapshot["dataset_history"] = {
+        "versions": len(session_executor.history.versions),
+        "bytes": session_executor.history.memory_usage()
     }
+    return snapshot
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
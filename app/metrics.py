@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import tracemalloc
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- Configuration (environment variables) ---
+# Add a `Server-Timing` header to every response (clients can also opt in per
+# request by sending `X-Request-Timing: 1`).
+TIMING_HEADERS = os.getenv("AUTOANALYST_TIMING_HEADERS", "0") == "1"
+# Track Python allocations per stage with tracemalloc (adds noticeable overhead).
+TRACE_ALLOCATIONS = os.getenv("AUTOANALYST_TRACE_ALLOCATIONS", "0") == "1"
+RECENT_SAMPLES = 512  # Durations kept per stage for percentiles
+
+if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# Stages recorded while handling the current HTTP request (set by the middleware)
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None if it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageStats:
+    """Running aggregates for one stage name."""
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.rss_delta_bytes = 0
+        self.alloc_delta_bytes = 0
+
+    def add(self, duration_ms, rss_delta=None, alloc_delta=None):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.min_ms = min(self.min_ms, duration_ms)
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.recent.append(duration_ms)
+        if rss_delta is not None:
+            self.rss_delta_bytes += rss_delta
+        if alloc_delta is not None:
+            self.alloc_delta_bytes += alloc_delta
+
+    def to_dict(self):
+        recent = np.array(self.recent)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3),
+            "min_ms": round(self.min_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(float(np.percentile(recent, 50)), 3),
+            "p95_ms": round(float(np.percentile(recent, 95)), 3),
+            "rss_delta_mb": round(self.rss_delta_bytes / 1e6, 3),
+            "alloc_delta_mb": round(self.alloc_delta_bytes / 1e6, 3) if TRACE_ALLOCATIONS else None
+        }
+
+
+class MetricsRegistry:
+    """Process-wide, thread-safe store of per-stage timings."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.started_at = time.time()
+
+    def record(self, name, duration_ms, rss_delta=None, alloc_delta=None):
+        with self._lock:
+            self._stages.setdefault(name, StageStats()).add(duration_ms, rss_delta, alloc_delta)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, duration_ms))
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: stats.to_dict() for name, stats in sorted(self._stages.items())}
+        rss = _rss_bytes()
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "rss_mb": round(rss / 1e6, 1) if rss is not None else None,
+            "stages": stages
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self.started_at = time.time()
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block and records its duration plus RSS (and optionally
+    tracemalloc) deltas under `name`:
+
+        with stage("read_dataset"):
+            df = pd.read_csv(path)
+    """
+    rss_before = _rss_bytes()
+    alloc_before = tracemalloc.get_traced_memory()[0] if TRACE_ALLOCATIONS else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        rss_after = _rss_bytes()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        alloc_delta = tracemalloc.get_traced_memory()[0] - alloc_before if TRACE_ALLOCATIONS else None
+        registry.record(name, duration_ms, rss_delta, alloc_delta)
+
+
+def timed(name):
+    """Decorator version of `stage` (works for sync and async functions)."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request():
+    """Starts collecting stages for the current request; returns the list."""
+    stages = []
+    _request_stages.set(stages)
+    return stages
+
+
+def server_timing_header(stages, total_ms):
+    """
+    Formats stages as a `Server-Timing` header. `total` is the whole request,
+    so total minus the stages is routing, validation and JSON serialization.
+    """
+    parts = []
+    for name, duration_ms in stages:
+        metric = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        parts.append(f'{metric};dur={duration_ms:.1f};desc="{name}"')
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
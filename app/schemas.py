@@ -1,5 +1,7 @@
 from pydantic import BaseModel
-from typing import List, Any, Dict, Optional
+from typing import List, Any, Dict, Literal, Optional
+
+TableFormat = Literal["arrow", "json"]
 
 class DatasetPreview(BaseModel):
     filename: str
@@ -18,18 +20,53 @@ class ResponseModel(BaseModel):
 
 class CodeRequest(BaseModel):
     code: str
+    table_format: TableFormat = "json" # How DataFrame/Series results are encoded
+
+class TableAttachment(BaseModel):
+    table_id: str # Use with GET /tables/{table_id} to fetch more pages
+    name: str
+    format: TableFormat
+    total_rows: int
+    num_columns: int
+    columns: List[str]
+    offset: int # First row included in this page
+    row_count: int # Rows included in this page
+    data: Optional[str] = None # Base64 Arrow IPC stream (format="arrow")
+    rows: Optional[List[List[Any]]] = None # Row-major values (format="json")
 
 class CodeResponse(BaseModel):
     text_output: str
     image_output: Optional[str] = None # Base64 PNG string
     error: Optional[str] = None
+    cached: bool = False # True if served from the execution result cache
+    tables: List[TableAttachment] = []
 
 class ChatRequest(BaseModel):
     message: str
     file_id: str # We need to know WHICH file to analyze
+    table_format: TableFormat = "json"
 
 class ChatResponse(BaseModel):
     response_text: str
     generated_code: str
     image_output: Optional[str] = None
+    tables: List[TableAttachment] = []
+
+class DatasetVersionInfo(BaseModel):
+    version_id: int
+    label: str # First line of the code that produced this version
+    created_at: float
+    shape: List[int]
+    changed_columns: List[str]
+    added_bytes: int # Memory this version added on top of the previous ones
 
+class DatasetDiff(BaseModel):
+    from_version: int
+    to_version: int
+    shape_before: List[int]
+    shape_after: List[int]
+    added_columns: List[str]
+    removed_columns: List[str]
+    changed_columns: List[str]
+    rows_added: int
+    rows_removed: int
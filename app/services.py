@@ -1,12 +1,32 @@
 import pandas as pd
 import os
+import glob
 import shutil
 import uuid
+import hashlib
 from fastapi import UploadFile, HTTPException
+from app.metrics import timed
 
 UPLOAD_DIR = "temp_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Optional fast Excel engine (Rust-based). If it's not installed we fall back
+# to a read-only openpyxl stream that only keeps the requested columns.
+try:
+    import python_calamine
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Optional columnar cache: parsed uploads are stored next to the original file
+# as Parquet so every later read skips the CSV/Excel parser entirely.
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+@timed("save_file_locally")
 def save_file_locally(file: UploadFile) -> str:
     """
     Saves the uploaded file with a unique name to avoid conflicts.
@@ -23,35 +43,190 @@ def save_file_locally(file: UploadFile) -> str:
         
     return file_path, file_id
 
-def read_dataset(file_path: str):
+def cache_path_for(file_path: str, sheet_name=None, usecols=None) -> str:
+    """
+    Path of the columnar (Parquet) cache that belongs to an uploaded file.
+    Each sheet/column selection gets its own cache file, so a later read
+    with a different selection never gets the first one back.
+    """
+    base = os.path.splitext(file_path)[0]
+    usecols = parse_columns(usecols)
+    if sheet_name in (None, "", 0, "0") and usecols is None:
+        return base + ".parquet"
+    selection = repr((str(sheet_name if sheet_name not in (None, "") else 0), usecols))
+    return f"{base}.{hashlib.sha256(selection.encode('utf-8')).hexdigest()[:16]}.parquet"
+
+def parse_sheet_name(sheet_name, sheet_names=()):
+    """
+    Sheet names arrive as strings from the upload form.
+    A purely numeric value is treated as a sheet index ("0" -> first sheet),
+    unless the workbook has a sheet with exactly that name (e.g. "2023").
+    """
+    if sheet_name is None or sheet_name == "":
+        return 0
+    if isinstance(sheet_name, str) and sheet_name.isdigit() and sheet_name not in sheet_names:
+        return int(sheet_name)
+    return sheet_name
+
+def _excel_sheet_names(file_path: str):
+    """Sheet names of a workbook, read without parsing any cells."""
+    if EXCEL_ENGINE:
+        return python_calamine.CalamineWorkbook.from_path(file_path).sheet_names
+    with pd.ExcelFile(file_path) as workbook:
+        return workbook.sheet_names
+
+def parse_columns(columns):
+    """Turns a comma-separated form value into a list of column names (or None)."""
+    if not columns:
+        return None
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    return [c for c in columns if c] or None
+
+def _dedupe_headers(header):
+    """Renames repeated column names the way pandas does: a, a.1, a.2, ..."""
+    taken = set(header)
+    seen = set()
+    result = []
+    for name in header:
+        if name in seen:
+            # Skip suffixes that are already real headers elsewhere in the row
+            count = 1
+            while f"{name}.{count}" in seen or f"{name}.{count}" in taken:
+                count += 1
+            name = f"{name}.{count}"
+        seen.add(name)
+        result.append(name)
+    return result
+
+def _read_xlsx_streaming(file_path: str, sheet_name=0, usecols=None):
+    """
+    Streams an .xlsx sheet row by row with openpyxl's read-only mode.
+    Only the requested columns are kept, so memory stays proportional to the
+    selected data rather than the whole workbook.
     """
-    Helper to read CSV/Excel with error handling for encodings.
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet_name = parse_sheet_name(sheet_name, workbook.sheetnames)
+        if isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        header = _dedupe_headers([str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)])
+
+        if usecols is None:
+            keep = list(range(len(header)))
+        else:
+            missing = [c for c in usecols if c not in header]
+            if missing:
+                raise ValueError(f"Columns not found in sheet: {missing}")
+            keep = [header.index(c) for c in usecols]
+
+        data = {header[i]: [] for i in keep}
+        row_count = 0
+        for n, row in enumerate(rows, start=1):
+            for i in keep:
+                data[header[i]].append(row[i] if i < len(row) else None)
+            if any(v is not None for v in row):
+                row_count = n
+    finally:
+        workbook.close()
+
+    # Blank rows inside the data stay (as NaN rows, like pd.read_excel);
+    # only the empty trailing rows Excel likes to leave behind are dropped
+    data = {name: values[:row_count] for name, values in data.items()}
+
+    # Let pandas infer proper dtypes (ints, floats, datetimes) from the raw cells
+    return pd.DataFrame(data).infer_objects()
+
+def _read_excel(file_path: str, sheet_name=0, usecols=None):
+    """Picks the fastest available Excel reader."""
+    if not EXCEL_ENGINE and file_path.endswith('.xlsx'):
+        # Resolves the sheet name itself, from the workbook it already has open
+        return _read_xlsx_streaming(file_path, sheet_name=sheet_name, usecols=usecols)
+    if isinstance(sheet_name, str) and sheet_name.isdigit():
+        sheet_name = parse_sheet_name(sheet_name, _excel_sheet_names(file_path))
+    else:
+        sheet_name = parse_sheet_name(sheet_name)
+    if EXCEL_ENGINE:
+        return pd.read_excel(file_path, sheet_name=sheet_name, usecols=usecols, engine=EXCEL_ENGINE)
+    # Legacy .xls files have no streaming reader
+    return pd.read_excel(file_path, sheet_name=sheet_name, usecols=usecols)
+
+def _read_csv(file_path: str, usecols=None):
+    """
+    Reads CSV with error handling for encodings.
     Tries UTF-8 first, then Latin-1 (common for financial data), then CP1252.
     """
-    if file_path.endswith('.csv'):
-        # Try default UTF-8 first
+    # Try default UTF-8 first
+    try:
+        return pd.read_csv(file_path, usecols=usecols)
+    except UnicodeDecodeError:
+        # Fallback to Latin-1 (common for Excel-generated CSVs)
         try:
-            return pd.read_csv(file_path)
+            return pd.read_csv(file_path, encoding='latin1', usecols=usecols)
         except UnicodeDecodeError:
-            # Fallback to Latin-1 (common for Excel-generated CSVs)
-            try:
-                return pd.read_csv(file_path, encoding='latin1')
-            except UnicodeDecodeError:
-                # Last resort fallback
-                return pd.read_csv(file_path, encoding='cp1252')
-                
+            # Last resort fallback
+            return pd.read_csv(file_path, encoding='cp1252', usecols=usecols)
+
+def _write_cache(df: pd.DataFrame, cache_path: str):
+    """Stores the parsed frame as Parquet. Failing to cache is never fatal."""
+    if not PARQUET_AVAILABLE:
+        return
+    try:
+        df.to_parquet(cache_path, index=False)
+    except Exception as e:
+        # e.g. object columns with mixed types that Arrow can't represent
+        print(f"Skipping columnar cache {cache_path}: {e}")
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+@timed("read_dataset")
+def read_dataset(file_path: str, sheet_name=None, usecols=None):
+    """
+    Helper to read CSV/Excel into a DataFrame.
+    The first read of an upload parses the original file (with the optional
+    sheet/column selection) and writes a Parquet cache; later reads of the
+    same upload load that cache instead.
+    """
+    cache_path = cache_path_for(file_path, sheet_name, usecols)
+    if PARQUET_AVAILABLE and os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+
+    usecols = parse_columns(usecols)
+    if file_path.endswith('.csv'):
+        df = _read_csv(file_path, usecols=usecols)
     elif file_path.endswith(('.xls', '.xlsx')):
-        return pd.read_excel(file_path)
+        df = _read_excel(file_path, sheet_name=sheet_name, usecols=usecols)
     else:
         raise ValueError("Unsupported file format")
 
-def load_and_preview_data(file_path: str, original_filename: str, content_type: str):
+    _write_cache(df, cache_path)
+    return df
+
+def remove_dataset_files(file_path: str):
+    """Deletes an upload together with all of its columnar caches."""
+    base = os.path.splitext(file_path)[0]
+    for path in [file_path, base + ".parquet"] + glob.glob(glob.escape(base) + ".*.parquet"):
+        if os.path.exists(path):
+            os.remove(path)
+
+@timed("load_and_preview_data")
+def load_and_preview_data(file_path: str, original_filename: str, content_type: str,
+                          sheet_name=None, usecols=None):
     """
     Reads CSV/Excel using the robust reader and returns metadata.
     """
     try:
         # Use the helper function here so we don't crash on encoding errors
-        df = read_dataset(file_path)
+        df = read_dataset(file_path, sheet_name=sheet_name, usecols=usecols)
 
         preview = {
             "filename": original_filename,
@@ -0,0 +1,105 @@
+import io
+import json
+import base64
+import pandas as pd
+
+# Arrow is optional: without it tables are always sent as paginated JSON
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+TABLE_FORMATS = ("arrow", "json")
+# Rows per page. Arrow pages are cheap to build and parse, JSON ones are not.
+PAGE_ROWS = {"arrow": 10_000, "json": 500}
+
+
+def _unique_names(names) -> list:
+    """Column names as unique strings: a repeated 'a' becomes 'a.1', 'a.2', ..."""
+    names = [str(n) for n in names]
+    taken, seen, result = set(names), set(), []
+    for name in names:
+        if name in seen:
+            count = 1
+            while f"{name}.{count}" in seen or f"{name}.{count}" in taken:
+                count += 1
+            name = f"{name}.{count}"
+        seen.add(name)
+        result.append(name)
+    return result
+
+
+def as_frame(obj) -> pd.DataFrame:
+    """
+    Normalizes a DataFrame/Series for transport. A meaningful index (labels
+    like describe()'s 'mean'/'std', or a named group-by index) becomes a
+    regular column; a plain positional index is dropped. Column names are
+    made unique strings, e.g. when the index is also kept as a column
+    (`set_index('cat', drop=False)`) or after `pd.concat(..., axis=1)`.
+    """
+    if isinstance(obj, pd.Series):
+        frame = obj.to_frame(name=obj.name if obj.name is not None else "value")
+    else:
+        frame = obj
+    index = frame.index
+    keep_index = isinstance(index, pd.MultiIndex) or any(index.names) or not pd.api.types.is_numeric_dtype(index)
+    if keep_index:
+        frame = frame.reset_index(allow_duplicates=True)
+    else:
+        frame = frame.reset_index(drop=True)
+    # Arrow and JSON both need unique string column names
+    frame.columns = _unique_names(frame.columns)
+    return frame
+
+
+def _encode_arrow(page: pd.DataFrame) -> str:
+    table = pa.Table.from_pandas(page, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue()).decode('utf-8')
+
+
+def _encode_json(page: pd.DataFrame) -> list:
+    # to_json takes care of NaN -> null, numpy scalars and timestamps;
+    # anything else (e.g. dtype objects from df.dtypes) is sent as its str()
+    return json.loads(page.to_json(orient='values', date_format='iso', default_handler=str))
+
+
+def encode_table(table_id: str, name: str, obj, fmt: str = "json", offset: int = 0, limit: int = None) -> dict:
+    """
+    Encodes one page of a captured DataFrame/Series as a TableAttachment dict.
+    Falls back to JSON when Arrow isn't installed or can't represent the data
+    (e.g. object columns with mixed types).
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format '{fmt}' (expected one of {TABLE_FORMATS})")
+    if fmt == "arrow" and not ARROW_AVAILABLE:
+        fmt = "json"
+
+    frame = as_frame(obj)
+    limit = limit or PAGE_ROWS[fmt]
+    page = frame.iloc[offset:offset + limit]
+
+    attachment = {
+        "table_id": table_id,
+        "name": name,
+        "format": fmt,
+        "total_rows": len(frame),
+        "num_columns": len(frame.columns),
+        "columns": list(frame.columns),
+        "offset": offset,
+        "row_count": len(page),
+        "data": None,
+        "rows": None
+    }
+    if fmt == "arrow":
+        try:
+            attachment["data"] = _encode_arrow(page)
+            return attachment
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError):
+            attachment["format"] = "json"
+    attachment["rows"] = _encode_json(page)
+    return attachment
+
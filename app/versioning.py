@@ -0,0 +1,273 @@
+import itertools
+import time
+import numpy as np
+import pandas as pd
+
+# Copy-on-Write lets snapshots share column buffers with the live DataFrame:
+# a later write to `df` copies only the column being modified instead of
+# silently changing the snapshot. Always on from pandas 3.0, which
+# requirements.txt pins. Should an older pandas be installed anyway, changed
+# columns are deep-copied instead (much more memory, but still correct):
+# turning the option on there would change pandas behaviour process-wide.
+COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+DEFAULT_MAX_HISTORY_BYTES = 512 * 1024 * 1024  # 512 MB of retained column data
+
+
+def _series_nbytes(series: pd.Series) -> int:
+    return int(series.memory_usage(index=False, deep=False))
+
+
+def _short_label(code: str) -> str:
+    """First non-empty line of the code that produced a version."""
+    for line in (code or "").splitlines():
+        if line.strip():
+            return line.strip()[:120]
+    return ""
+
+
+def _same_column(old: pd.Series, new: pd.Series) -> bool:
+    """
+    Cheap check first (shared buffer under Copy-on-Write), then a full
+    value comparison so deep copies like `auto_clean` still dedupe.
+    """
+    if old is new:
+        return True
+    if old.dtype != new.dtype or len(old) != len(new):
+        return False
+    if COPY_ON_WRITE and isinstance(old.dtype, np.dtype) and old.dtype != object:
+        old_values = old.to_numpy(copy=False)
+        new_values = new.to_numpy(copy=False)
+        if (old_values.__array_interface__["data"][0] == new_values.__array_interface__["data"][0]
+                and old_values.strides == new_values.strides):
+            return True
+    return old.equals(new)
+
+
+class _Repeat:
+    """
+    Key of the n-th repeat (n >= 1) of a column name, for frames with duplicate
+    column names (e.g. after `pd.concat([df, dummies], axis=1)`). Shown as "name.n".
+    """
+    __slots__ = ("name", "n")
+
+    def __init__(self, name, n):
+        self.name = name
+        self.n = n
+
+    def __eq__(self, other):
+        return isinstance(other, _Repeat) and (self.name, self.n) == (other.name, other.n)
+
+    def __hash__(self):
+        return hash((_Repeat, self.name, self.n))
+
+    def __str__(self):
+        return f"{self.name}.{self.n}"
+
+    __repr__ = __str__
+
+
+def _column_keys(columns) -> list:
+    """One unique key per column position: the name itself, or a _Repeat for duplicates."""
+    seen = {}
+    keys = []
+    for name in columns:
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        keys.append(name if n == 0 else _Repeat(name, n))
+    return keys
+
+
+class DatasetVersion:
+    """
+    One entry in the history. Columns are stored as Series together with a
+    'token' per column; versions that did not change a column share both the
+    Series and its token, so the data is only held once.
+    """
+    def __init__(self, version_id, label, columns, tokens, index, changed_columns, column_names=None):
+        self.version_id = version_id
+        self.label = label
+        self.created_at = time.time()
+        self.columns = columns              # {key: Series}, see _column_keys
+        self.tokens = tokens                # {key: token}
+        self.index = index
+        self.changed_columns = changed_columns
+        # The original column labels (may contain duplicates)
+        self.column_names = column_names if column_names is not None else pd.Index(list(columns))
+
+    @property
+    def shape(self):
+        return [len(self.index), len(self.columns)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rebuilds a DataFrame (sharing the stored columns under Copy-on-Write, copying them otherwise)."""
+        if not self.columns:
+            return pd.DataFrame(index=self.index)
+        frame = pd.concat(list(self.columns.values()), axis=1)
+        frame.columns = self.column_names
+        return frame
+
+    def summary(self, added_bytes: int = 0) -> dict:
+        return {
+            "version_id": self.version_id,
+            "label": self.label,
+            "created_at": self.created_at,
+            "shape": self.shape,
+            "changed_columns": self.changed_columns,
+            "added_bytes": added_bytes
+        }
+
+
+class DatasetHistory:
+    """
+    Versioned history of the session's `df`.
+
+    `commit(df)` records a new version only if something changed, and the new
+    version costs only the columns that differ from the previous one. Old
+    versions are evicted (oldest first) once the retained data exceeds
+    `max_bytes`; the current version is never evicted.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_HISTORY_BYTES):
+        self.max_bytes = max_bytes
+        self.versions = []
+        self._ids = itertools.count(1)
+        self._tokens = itertools.count(1)
+        self._token_bytes = {}    # token -> nbytes of that column
+        self._token_added_by = {} # token -> version_id that first stored it
+        self.on_evict = None      # optional callback(list_of_evicted_ids)
+
+    # --- Recording ---
+    @property
+    def current(self):
+        return self.versions[-1] if self.versions else None
+
+    def reset(self, df: pd.DataFrame = None, label: str = "Initial upload"):
+        """Drops the whole history (e.g. on a new upload) and starts over."""
+        evicted = [v.version_id for v in self.versions]
+        self.versions = []
+        self._token_bytes = {}
+        self._token_added_by = {}
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+        if df is not None:
+            return self.commit(df, label=label)
+        return None
+
+    def commit(self, df, label: str = ""):
+        """
+        Records `df` as a new version if it differs from the current one.
+        Returns the version that now describes `df`.
+        """
+        if not isinstance(df, pd.DataFrame):
+            return self.current
+
+        previous = self.current
+        same_index = previous is not None and (
+            previous.index is df.index or previous.index.equals(df.index)
+        )
+
+        columns, tokens, changed = {}, {}, []
+        # By position: with duplicate names df[name] would be a DataFrame
+        for name, (_, series) in zip(_column_keys(df.columns), df.items()):
+            if same_index and name in previous.columns and _same_column(previous.columns[name], series):
+                # Unchanged: reuse the stored Series (and its buffer)
+                columns[name] = previous.columns[name]
+                tokens[name] = previous.tokens[name]
+                continue
+            # Changed or new column: keep a private reference to it.
+            # Under Copy-on-Write a shallow copy is enough.
+            stored = series.copy(deep=not COPY_ON_WRITE)
+            token = next(self._tokens)
+            self._token_bytes[token] = _series_nbytes(stored)
+            columns[name] = stored
+            tokens[name] = token
+            changed.append(name)
+
+        removed = [str(c) for c in previous.columns if c not in columns] if previous else []
+        reordered = previous is not None and list(previous.columns) != list(columns)
+        if previous is not None and same_index and not changed and not removed and not reordered:
+            return previous
+
+        version = DatasetVersion(
+            version_id=next(self._ids),
+            label=_short_label(label),
+            columns=columns,
+            tokens=tokens,
+            index=df.index,
+            changed_columns=[str(c) for c in changed] + removed,
+            column_names=df.columns
+        )
+        for name in changed:
+            self._token_added_by[tokens[name]] = version.version_id
+        self.versions.append(version)
+        self._enforce_limit()
+        return version
+
+    # --- Inspection ---
+    def get(self, version_id: int) -> DatasetVersion:
+        for version in self.versions:
+            if version.version_id == version_id:
+                return version
+        raise KeyError(f"Version {version_id} not found (it may have been evicted)")
+
+    def memory_usage(self) -> int:
+        """Bytes held by all retained versions (shared columns counted once)."""
+        return sum(self._token_bytes[t] for t in self._live_tokens())
+
+    def list_versions(self):
+        return [v.summary(self._added_bytes(v)) for v in self.versions]
+
+    def diff(self, from_id: int, to_id: int) -> dict:
+        old, new = self.get(from_id), self.get(to_id)
+        common = [c for c in new.columns if c in old.columns]
+        return {
+            "from_version": from_id,
+            "to_version": to_id,
+            "shape_before": old.shape,
+            "shape_after": new.shape,
+            "added_columns": [str(c) for c in new.columns if c not in old.columns],
+            "removed_columns": [str(c) for c in old.columns if c not in new.columns],
+            "changed_columns": [str(c) for c in common if old.tokens[c] != new.tokens[c]],
+            "rows_added": max(len(new.index) - len(old.index), 0),
+            "rows_removed": max(len(old.index) - len(new.index), 0)
+        }
+
+    def rollback(self, version_id: int) -> pd.DataFrame:
+        """
+        Makes `version_id` the current version again and returns its frame.
+        Versions newer than it are discarded.
+        """
+        target = self.get(version_id)
+        position = self.versions.index(target)
+        dropped = [v.version_id for v in self.versions[position + 1:]]
+        self.versions = self.versions[:position + 1]
+        self._forget_unused_tokens()
+        if dropped and self.on_evict:
+            self.on_evict(dropped)
+        return target.to_frame()
+
+    # --- Internals ---
+    def _live_tokens(self):
+        return {t for v in self.versions for t in v.tokens.values()}
+
+    def _added_bytes(self, version: DatasetVersion) -> int:
+        return sum(
+            self._token_bytes.get(t, 0) for t in set(version.tokens.values())
+            if self._token_added_by.get(t) == version.version_id
+        )
+
+    def _forget_unused_tokens(self):
+        live = self._live_tokens()
+        for token in list(self._token_bytes):
+            if token not in live:
+                del self._token_bytes[token]
+                self._token_added_by.pop(token, None)
+
+    def _enforce_limit(self):
+        evicted = []
+        while len(self.versions) > 1 and self.memory_usage() > self.max_bytes:
+            evicted.append(self.versions.pop(0).version_id)
+        if evicted:
+            self._forget_unused_tokens()
+            if self.on_evict:
+                self.on_evict(evicted)
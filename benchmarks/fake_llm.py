@@ -0,0 +1,76 @@
+"""
+Deterministic stand-in LLM, used by the benchmarks.
+
+It plugs into `app.llm_client` as a `FakeBackend`, so the real prompt
+building, client (retries, coalescing, concurrency limit) and response
+handling still run, but Gemini is never called: the "generated" code is
+picked from the prompt with simple keyword rules, so every run executes
+exactly the same code.
+"""
+import ast
+import os
+import re
+
+WELCOME_MESSAGE = "Hello! I've loaded your dataset. (benchmark stand-in LLM)"
+
+
+def _parse_prompt(prompt: str):
+    """Pulls the user request, columns and numeric columns out of the code prompt."""
+    query = re.search(r'USER REQUEST:\s*"(.*?)"', prompt, re.S)
+    columns = re.search(r"- Columns: (\[.*?\])\n", prompt)
+    summary = re.search(r"- Summary Statistics: (.*?)\n", prompt)
+    query = query.group(1) if query else ""
+    columns = ast.literal_eval(columns.group(1)) if columns else []
+    summary = summary.group(1) if summary else ""
+    # describe() only includes numeric columns, as "'col': {'count': ..."
+    numeric = [c for c in columns if f"{c!r}: {{" in summary]
+    return query, columns, numeric
+
+
+def _pick_numeric_column(columns, numeric, query):
+    """Column mentioned in the query if any, else the first numeric one."""
+    for col in columns:
+        if str(col).lower() in query.lower():
+            return col
+    return numeric[0] if numeric else columns[0]
+
+
+def generate_code(query: str, columns: list, numeric: list) -> str:
+    q = query.lower()
+    col = _pick_numeric_column(columns, numeric, query)
+
+    if "predict" in q or "model" in q:
+        return (
+            "df_model, _ = auto_encode(df)\n"
+            f"results, msg = find_best_model(df_model, target_col={col!r})\n"
+            "print(results)\n"
+            "print(msg)"
+        )
+    if "clean" in q or "missing" in q:
+        return (
+            "issues = identify_issues(df)\n"
+            "print(issues)\n"
+            "df, log = auto_clean(df)\n"
+            "print(log)"
+        )
+    if "plot" in q or "distribution" in q:
+        return (
+            "plt.figure(figsize=(10, 6))\n"
+            f"plt.hist(df[{col!r}].dropna(), bins=30)\n"
+            f"plt.title('Distribution of {col}')"
+        )
+    return "print(df.describe())"
+
+
+def respond(prompt: str) -> str:
+    """FakeBackend responder: welcome text for the upload prompt, code otherwise."""
+    if "USER REQUEST:" not in prompt:
+        return WELCOME_MESSAGE
+    return generate_code(*_parse_prompt(prompt))
+
+
+def install():
+    """Routes all LLM calls to the fake backend (must run before `app.main` is imported)."""
+    os.environ["AUTOANALYST_LLM_BACKEND"] = "fake"
+    from app import llm_client
+    return llm_client.set_backend(llm_client.FakeBackend(responder=respond))
@@ -0,0 +1,336 @@
+"""
+End-to-end benchmarks for the AutoAnalyst backend.
+
+Generates synthetic datasets of several sizes/widths, runs the FastAPI app
+in-process (no server, no Gemini: LLM calls go to the `fake_llm` backend) and
+measures latency, throughput and peak RSS for /upload, /execute, /chat and
+`find_best_model`.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py                       # default sizes
+    python benchmarks/run_benchmarks.py --quick               # smoke run
+    python benchmarks/run_benchmarks.py --rows 1000 100000 --cols 10 50
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json
+
+Results are written as JSON (default: benchmarks/results/<git commit>.json).
+`psutil` is optional; without it peak RSS falls back to the process-wide
+maximum reported by `resource`.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+EXECUTE_SNIPPETS = {
+    "describe": "print(df.describe())",
+    "groupby": "print(df.groupby('category')[df.select_dtypes('number').columns[0]].mean())",
+    "plot": "plt.figure(figsize=(8, 5))\nplt.hist(df['num_0'].dropna(), bins=50)\nplt.title('num_0')",
+}
+# LLM + exec path. These must not match the /chat fast path (app/aggregates.py),
+# so chat_0 asks for the same plot as before without saying "distribution of".
+CHAT_QUERIES = [
+    "Plot num_0 as a histogram",
+    "Give me summary statistics",
+    "Check for missing values and clean the data",
+]
+# Answered from the precomputed aggregate index (no LLM, no exec)
+FAST_PATH_QUERY = "Plot the distribution of num_0"
+
+
+# ------------------------------------------------------------------
+# Synthetic data
+# ------------------------------------------------------------------
+def make_dataset(n_rows: int, n_cols: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Mixed-type frame: mostly floats, some ints, a low-cardinality
+    'category' column, ~2% missing values and a numeric 'target'.
+    """
+    rng = np.random.default_rng(seed)
+    n_features = max(n_cols - 2, 1)  # minus 'category' and 'target'
+    data = {}
+    for i in range(n_features):
+        if i % 5 == 4:
+            data[f"int_{i}"] = rng.integers(0, 1000, n_rows)
+        else:
+            values = rng.normal(size=n_rows)
+            values[rng.random(n_rows) < 0.02] = np.nan
+            data[f"num_{i}"] = values
+    data["category"] = rng.choice(["alpha", "beta", "gamma", "delta"], n_rows)
+    numeric = np.column_stack([np.nan_to_num(v) for v in data.values() if np.issubdtype(v.dtype, np.number)])
+    data["target"] = numeric @ rng.random(numeric.shape[1]) + rng.normal(size=n_rows)
+    return pd.DataFrame(data)
+
+
+# ------------------------------------------------------------------
+# Measurement helpers
+# ------------------------------------------------------------------
+class PeakRSS:
+    """Samples the process RSS in a background thread while the block runs."""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_mb = self.peak_mb = self._current_mb()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _current_mb():
+        if psutil is not None:
+            return psutil.Process().memory_info().rss / 1e6
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux and bytes on macOS
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self._current_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._current_mb())
+
+
+def measure(fn, repeats: int):
+    """Calls fn() `repeats` times; returns latency stats, throughput and RSS."""
+    latencies = []
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        total = time.perf_counter() - started
+    latencies = np.array(latencies)
+    return {
+        "repeats": repeats,
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "min": round(float(latencies.min()), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "throughput_per_s": round(repeats / total, 3) if total > 0 else None,
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "rss_delta_mb": round(rss.peak_mb - rss.start_mb, 1),
+    }
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:500]}")
+    return response.json()
+
+
+# ------------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------------
+def bench_api(client, df: pd.DataFrame, repeats: int):
+    """Runs the HTTP scenarios against one dataset."""
+    results = {}
+    csv_bytes = df.to_csv(index=False).encode()
+
+    state = {}
+
+    def upload():
+        files = {"file": ("bench.csv", io.BytesIO(csv_bytes), "text/csv")}
+        state["file_id"] = _check(client.post("/upload", files=files))["file_id"]
+
+    results["upload"] = measure(upload, repeats)
+
+    for name, code in EXECUTE_SNIPPETS.items():
+        counter = iter(range(10 ** 9))
+
+        def execute_cold():
+            # A unique no-op binding defeats the result cache
+            _check(client.post("/execute", json={"code": f"{code}\n_bench_run = {next(counter)}"}))
+
+        def execute_warm():
+            _check(client.post("/execute", json={"code": code}))
+
+        upload()  # fresh df for every snippet
+        results[f"execute_{name}_cold"] = measure(execute_cold, repeats)
+        execute_warm()
+        results[f"execute_{name}_warm"] = measure(execute_warm, repeats)
+
+    for i, query in enumerate(CHAT_QUERIES):
+        upload()
+
+        def chat():
+            _check(client.post("/chat", json={"message": query, "file_id": state["file_id"]}))
+
+        results[f"chat_{i}"] = measure(chat, repeats)
+        results[f"chat_{i}"]["query"] = query
+
+    # Fast path: "cold" renders the answer every time, "warm" gets the memoized one
+    from app.main import AGGREGATE_INDEX
+    upload()
+
+    def chat_fast_path(clear_memo):
+        def chat():
+            if clear_memo:
+                AGGREGATE_INDEX[state["file_id"]]["answers"].clear()
+            body = _check(client.post("/chat", json={"message": FAST_PATH_QUERY, "file_id": state["file_id"]}))
+            if not body["generated_code"].startswith("# Answered from the precomputed index"):
+                raise RuntimeError(f"Fast-path query went to the LLM: {FAST_PATH_QUERY!r}")
+        return chat
+
+    results["chat_fast_path_cold"] = measure(chat_fast_path(clear_memo=True), repeats)
+    chat_fast_path(clear_memo=False)()
+    results["chat_fast_path_warm"] = measure(chat_fast_path(clear_memo=False), repeats)
+    for scenario in ("chat_fast_path_cold", "chat_fast_path_warm"):
+        results[scenario]["query"] = FAST_PATH_QUERY
+
+    return results
+
+
+def bench_automl(df: pd.DataFrame, repeats: int, cv_values):
+    """Calls find_best_model directly (encoded data, no HTTP)."""
+    import matplotlib.pyplot as plt
+    from app.automl import auto_clean, auto_encode, find_best_model
+
+    prepared, _ = auto_clean(df)
+    prepared, _ = auto_encode(prepared)
+    results = {}
+    for cv in cv_values:
+        def run():
+            find_best_model(prepared, target_col="target", cv=cv)
+            plt.close("all")
+        results[f"find_best_model_cv{cv or 0}"] = measure(run, repeats)
+    return results
+
+
+# ------------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def environment_info():
+    import sklearn
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "rss_source": "psutil" if psutil is not None else "resource.ru_maxrss",
+    }
+
+
+def compare(current: dict, baseline_path: str):
+    """Prints the mean-latency change of every scenario vs a previous run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r["scenario"], r["rows"], r["cols"]): r for r in baseline["results"]}
+    print(f"\nComparison vs {baseline['meta'].get('commit')} ({baseline_path}):")
+    print(f"{'scenario':<34}{'rows':>9}{'cols':>6}{'old ms':>11}{'new ms':>11}{'change':>9}")
+    for r in current["results"]:
+        prev = old.get((r["scenario"], r["rows"], r["cols"]))
+        if prev is None:
+            continue
+        before, after = prev["latency_ms"]["mean"], r["latency_ms"]["mean"]
+        change = (after - before) / before * 100 if before else float("nan")
+        print(f"{r['scenario']:<34}{r['rows']:>9}{r['cols']:>6}{before:>11.1f}{after:>11.1f}{change:>8.1f}%")
+
+
+def run(args, output: str, baseline: str = None):
+    """Runs every scenario (from inside the scratch directory) and writes the report."""
+    import fake_llm
+    fake_llm.install()
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    report = {"meta": environment_info(), "results": []}
+
+    for n_rows in args.rows:
+        for n_cols in args.cols:
+            df = make_dataset(n_rows, n_cols)
+            print(f"--- {n_rows} rows x {n_cols} cols ---")
+            scenarios = bench_api(client, df, args.repeats)
+            if n_rows <= args.automl_max_rows:
+                scenarios.update(bench_automl(df, max(1, args.repeats // 2), [cv or None for cv in args.cv]))
+            for scenario, stats in scenarios.items():
+                print(f"{scenario:<34} mean={stats['latency_ms']['mean']:>10.1f} ms  "
+                      f"p95={stats['latency_ms']['p95']:>10.1f} ms  peak_rss={stats['peak_rss_mb']:>8.1f} MB")
+                report["results"].append({"scenario": scenario, "rows": n_rows, "cols": n_cols, **stats})
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if baseline:
+        compare(report, baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoAnalyst end-to-end benchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 50_000])
+    parser.add_argument("--cols", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--automl-max-rows", type=int, default=20_000,
+                        help="Skip find_best_model for larger datasets (it dominates runtime)")
+    parser.add_argument("--cv", type=int, nargs="+", default=[0, 3],
+                        help="find_best_model cv values to measure (0 = single split)")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    parser.add_argument("--quick", action="store_true", help="Tiny sizes, 2 repeats")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.rows, args.cols, args.repeats, args.cv = [500], [8], 2, [0]
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{git_commit()}.json")
+    output = os.path.abspath(output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    # The app writes uploads to ./temp_files, so run inside a scratch directory
+    # (removed afterwards, together with every upload and Parquet cache)
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="autoanalyst_bench_") as scratch:
+        os.chdir(scratch)
+        try:
+            run(args, output, baseline)
+        finally:
+            os.chdir(original_cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,17 @@ import requests
 import pandas as pd
 import json
 import base64
+import hashlib
+import pyarrow as pa  # Installed with streamlit; decodes Arrow table attachments
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Configuration ---
 BACKEND_URL = "http://127.0.0.1:8000"
+# (connect, read) timeouts in seconds. Chat covers LLM + execution + model training.
+UPLOAD_TIMEOUT = (5, 300)
+CHAT_TIMEOUT = (5, 300)
+HISTORY_PAGE_SIZE = 20    # Messages rendered per rerun (older ones behind a button)
 st.set_page_config(
     page_title="AutoAnalyst AI",
     page_icon="🤖",
@@ -35,6 +43,61 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "columns" not in st.session_state:
     st.session_state.columns = []
+# Messages only hold ids; decoded images/tables live here, keyed by a hash of
+# their content (decoded bytes are smaller than the base64 they arrived as)
+if "image_store" not in st.session_state:
+    st.session_state.image_store = {}
+if "table_store" not in st.session_state:
+    st.session_state.table_store = {}
+if "history_limit" not in st.session_state:
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+
+# --- Helper: Shared HTTP Session ---
+@st.cache_resource
+def get_http_session():
+    """
+    One keep-alive connection pool for every rerun and browser session.
+    Only idempotent GETs are retried automatically (uploads/chats are not).
+    """
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# --- Helper: Image & Table Stores ---
+def store_image(image_base64):
+    """Decodes a base64 PNG once and returns its id (identical plots share one entry)."""
+    if not image_base64:
+        return None
+    image_id = hashlib.sha1(image_base64.encode()).hexdigest()[:16]
+    if image_id not in st.session_state.image_store:
+        st.session_state.image_store[image_id] = base64.b64decode(image_base64)
+    return image_id
+
+def decode_table(table):
+    """Arrow IPC (base64) or row-major JSON -> DataFrame, ready for st.dataframe."""
+    if table["format"] == "arrow":
+        reader = pa.ipc.open_stream(base64.b64decode(table["data"]))
+        return reader.read_all().to_pandas()
+    return pd.DataFrame(table["rows"], columns=table["columns"])
+
+def store_tables(tables):
+    """
+    Decodes table attachments once; messages keep only their metadata.
+    Stored by content hash, not by the backend's table_id: those ids restart
+    from t1 whenever the backend does.
+    """
+    refs = []
+    for table in tables or []:
+        payload = table["data"] if table["format"] == "arrow" else json.dumps(table["rows"])
+        store_id = hashlib.sha1(json.dumps([table["columns"], payload]).encode()).hexdigest()[:16]
+        if store_id not in st.session_state.table_store:
+            st.session_state.table_store[store_id] = decode_table(table)
+        ref = {k: table[k] for k in ("table_id", "name", "total_rows", "num_columns", "row_count")}
+        refs.append({**ref, "store_id": store_id})
+    return refs
 
 # --- Helper: Send Message to Backend ---
 def send_message(prompt):
@@ -42,17 +105,18 @@ def send_message(prompt):
     st.session_state.messages.append({"role": "user", "content": prompt})
     
     # 2. Call Backend
-    payload = {"message": prompt, "file_id": st.session_state.file_id}
+    payload = {"message": prompt, "file_id": st.session_state.file_id, "table_format": "arrow"}
     
     try:
-        response = requests.post(f"{BACKEND_URL}/chat", json=payload)
+        response = get_http_session().post(f"{BACKEND_URL}/chat", json=payload, timeout=CHAT_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             st.session_state.messages.append({
                 "role": "assistant",
                 "content": data['response_text'],
-                "image": data['image_output'],
-                "code": data['generated_code']
+                "image_id": store_image(data['image_output']),
+                "code": data['generated_code'],
+                "tables": store_tables(data.get('tables'))
             })
         else:
             st.error(f"Server Error: {response.text}")
@@ -73,7 +137,7 @@ with st.sidebar:
         with st.spinner("🚀 Ingesting Data..."):
             files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
             try:
-                response = requests.post(f"{BACKEND_URL}/upload", files=files)
+                response = get_http_session().post(f"{BACKEND_URL}/upload", files=files, timeout=UPLOAD_TIMEOUT)
                 if response.status_code == 200:
                     data = response.json()
                     st.session_state.file_id = data['file_id']
@@ -87,7 +151,7 @@ with st.sidebar:
                         "role": "assistant",
                         "content": welcome_msg,
                         # No image/code for the welcome message
-                        "image": None,
+                        "image_id": None,
                         "code": None 
                     })
                     st.toast("File Uploaded Successfully!", icon="✅")
@@ -146,16 +210,29 @@ st.subheader("💬 Data Scientist Assistant")
 if not st.session_state.file_id:
     st.info("👈 Upload a dataset in the sidebar to activate the AI Agent.")
 else:
-    # Display Chat History
-    for msg in st.session_state.messages:
+    # Display Chat History (only the most recent page, so each rerun stays cheap)
+    messages = st.session_state.messages
+    hidden = max(len(messages) - st.session_state.history_limit, 0)
+    if hidden:
+        if st.button(f"⬆️ Show earlier messages ({hidden} hidden)"):
+            st.session_state.history_limit += HISTORY_PAGE_SIZE
+            st.rerun()
+
+    for msg in messages[hidden:]:
         avatar = "👤" if msg["role"] == "user" else "🤖"
         with st.chat_message(msg["role"], avatar=avatar):
             st.markdown(msg["content"])
             
-            # Show Image if available
-            if "image" in msg and msg["image"]:
-                image_data = base64.b64decode(msg["image"])
-                st.image(image_data, caption="Generated Insight")
+            # Show result tables (DataFrames/Series) natively
+            for table in msg.get("tables") or []:
+                st.caption(f"{table['name']} · {table['total_rows']} rows × {table['num_columns']} columns")
+                st.dataframe(st.session_state.table_store[table["store_id"]])
+                if table["row_count"] < table["total_rows"]:
+                    st.caption(f"Showing the first {table['row_count']} rows.")
+            
+            # Show Image if available (already decoded when it arrived)
+            if msg.get("image_id"):
+                st.image(st.session_state.image_store[msg["image_id"]], caption="Generated Insight")
             
             # Show Code inside an expander (Keep UI clean)
             if "code" in msg and msg["code"]:
@@ -0,0 +1,48 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Never talk to Gemini from the tests
+os.environ["AUTOANALYST_LLM_BACKEND"] = "fake"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import llm_client  # noqa: E402
+from app.executor import CodeExecutor  # noqa: E402
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        "age": [25, 30, 35, 28, 32, 41],
+        "salary": [50_000, 60_000, 70_000, 55_000, 65_000, 90_000],
+        "department": ["Eng", "Mkt", "Eng", "Design", "Sales", "Eng"]
+    })
+
+
+@pytest.fixture
+def executor(sample_df):
+    executor = CodeExecutor()
+    executor.load_dataset(sample_df)
+    return executor
+
+
+@pytest.fixture
+def client(sample_df):
+    from fastapi.testclient import TestClient
+
+    backend = llm_client.FakeBackend(
+        responder=lambda prompt: "print(len(df))" if "USER REQUEST:" in prompt else "Welcome!"
+    )
+    llm_client.set_backend(backend)
+    from app import main, services
+
+    with TestClient(main.app) as test_client:
+        buffer = io.BytesIO(sample_df.to_csv(index=False).encode("utf-8"))
+        response = test_client.post("/upload", files={"file": ("people.csv", buffer, "text/csv")})
+        assert response.status_code == 200
+        file_id = response.json()["file_id"]
+        yield test_client, file_id, backend
+    services.remove_dataset_files(f"{services.UPLOAD_DIR}/{file_id}.csv")
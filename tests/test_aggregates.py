@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.aggregates import answer_from_index, build_aggregate_index
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "rating": rng.choice([5, 1, 3, 2, 4], size=200, p=[0.4, 0.3, 0.1, 0.1, 0.1]),
+        "income": rng.normal(50_000, 10_000, size=200),
+        "region": rng.choice(["north", "south", "east"], size=200)
+    })
+    df.loc[::10, "income"] = np.nan
+    return build_aggregate_index(df, version_id=1)
+
+
+def test_discrete_numeric_histogram_is_in_value_order(index):
+    assert index["histograms"]["rating"]["kind"] == "discrete"
+    assert index["histograms"]["rating"]["labels"] == ["1", "2", "3", "4", "5"]
+
+
+def test_categorical_histogram_is_by_frequency(index):
+    counts = index["histograms"]["region"]["counts"]
+    assert counts == sorted(counts, reverse=True)
+
+
+@pytest.mark.parametrize("message", [
+    "How many missing values are there?",
+    "which columns have missing values",
+    "missing values",
+    "Are there any nulls in the dataset?",
+])
+def test_missing_value_questions_use_the_index(index, message):
+    answer = answer_from_index(message, index)
+    assert answer is not None
+    assert "**income**: 20" in answer["response_text"]
+
+
+@pytest.mark.parametrize("message", [
+    "show rows with missing values",
+    "plot missing values",
+    "drop missing values",
+    "how many missing values in income",
+])
+def test_other_missing_value_requests_fall_back_to_the_llm(index, message):
+    assert answer_from_index(message, index) is None
+
+
+def test_distribution_and_group_by(index):
+    assert answer_from_index("Plot the distribution of rating", index)["image_output"]
+    answer = answer_from_index("average income by region", index)
+    name, table = answer["tables"][0]
+    assert sorted(table.index) == ["east", "north", "south"]
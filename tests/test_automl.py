@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.automl import find_best_model
+
+
+@pytest.fixture
+def regression_df():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=40)
+    return pd.DataFrame({"x": x, "noise": rng.normal(size=40), "y": 3 * x + rng.normal(scale=0.1, size=40)})
+
+
+@pytest.mark.parametrize("cv, message", [
+    (1, "at least 2"),
+    (0, "at least 2"),
+    (2.5, "whole number"),
+    (True, "whole number"),
+    (41, "only 40"),
+])
+def test_invalid_cv(regression_df, cv, message):
+    with pytest.raises(ValueError, match=message):
+        find_best_model(regression_df, "y", cv=cv)
+
+
+def test_cross_validation(regression_df):
+    results, message = find_best_model(regression_df, "y", cv=3, n_jobs=1)
+    assert set(results["Folds"]) == {3}
+    assert "R2 Score Std" in results.columns
+    assert results["R2 Score"].max() > 0.9
@@ -0,0 +1,192 @@
+import ast
+import pytest
+
+from app.executor import _input_names, _is_side_effect_free
+
+
+def is_pure(code):
+    return _is_side_effect_free(ast.parse(code))
+
+
+# ------------------------------------------------------------------
+# Purity rules
+# ------------------------------------------------------------------
+@pytest.mark.parametrize("code", [
+    "print(df.describe())",
+    "top = df.nlargest(3, 'salary')\nprint(top)",
+    "print(df.groupby('department')['salary'].mean())",
+    "print(df.sample(3, random_state=0))",
+    "a, b = train_test_split(df, random_state=1)",
+    "a, b = train_test_split(df, shuffle=False)",
+    "folds = KFold(5, shuffle=True, random_state=0)",
+    "df.drop(columns=['age'], inplace=False)",
+])
+def test_pure_code(code):
+    assert is_pure(code)
+
+
+@pytest.mark.parametrize("code", [
+    "df['bonus'] = df['salary'] * 0.1",        # subscript store
+    "df.attrs = {}",                           # attribute store
+    "df.dropna(inplace=True)",
+    "items = []\nitems.append(1)",             # mutating method
+    "model.fit(X, y)",
+    "del df",
+    "import os\nprint(os.listdir('.'))",
+    "from datetime import datetime\nprint(datetime.now())",
+    "print(np.random.rand(3))",
+    "print(open('data.csv').read())",
+    "s = df.sample(3)\nprint(s)",              # unseeded randomness
+    "print(df.sample(3, random_state=None))",
+    "a, b = train_test_split(df)",
+    "folds = KFold(5, shuffle=True)",
+    "x = shuffle(df)",
+])
+def test_impure_code(code):
+    assert not is_pure(code)
+
+
+def test_input_names_ignore_names_assigned_first():
+    code = "msg = 'rows'\nprint(msg, len(df))\ntotal = df['salary'].sum() + bonus"
+    assert _input_names(ast.parse(code)) == {"print", "len", "df", "bonus"}
+
+
+def test_input_names_augmented_assignment_reads_target():
+    assert "counter" in _input_names(ast.parse("counter += 1"))
+
+
+def test_input_names_comprehension_scope():
+    inputs = _input_names(ast.parse("names = [c.upper() for c in df.columns]\nprint(c)"))
+    assert "c" in inputs  # the comprehension variable doesn't leak
+
+
+# ------------------------------------------------------------------
+# Hits and misses
+# ------------------------------------------------------------------
+def test_repeated_pure_code_hits_cache(executor):
+    first = executor.execute_code("print(df['salary'].mean())")
+    second = executor.execute_code("print(df['salary'].mean())  # again")
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["text_output"] == first["text_output"]
+    assert executor.cache.hits == 1
+
+
+def test_cache_hit_restores_bindings(executor):
+    executor.execute_code("avg = df['age'].mean()")
+    executor.locals.pop("avg")
+    assert executor.execute_code("avg = df['age'].mean()")["cached"] is True
+    assert executor.locals["avg"] == pytest.approx(executor.locals["df"]["age"].mean())
+
+
+def test_impure_code_is_never_cached(executor):
+    executor.execute_code("s = df.sample(3)\nprint(s)")
+    assert executor.execute_code("s = df.sample(3)\nprint(s)")["cached"] is False
+    assert len(executor.cache) == 0
+
+
+def test_failed_code_is_not_cached(executor):
+    assert executor.execute_code("print(df['missing_column'])")["error"]
+    assert len(executor.cache) == 0
+
+
+def test_df_change_invalidates(executor):
+    code = "print(len(df))"
+    executor.execute_code(code)
+    executor.execute_code("df = df[df['age'] > 30]")
+
+    result = executor.execute_code(code)
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "3"
+
+
+def test_rebinding_an_input_invalidates(executor):
+    executor.execute_code("threshold = 30")
+    code = "print((df['age'] > threshold).sum())"
+    assert executor.execute_code(code)["text_output"].strip() == "3"
+
+    executor.execute_code("threshold = 40")
+    result = executor.execute_code(code)
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "1"
+
+
+def test_code_that_rebinds_its_input_is_not_reused(executor):
+    # `df = ...` changes df, so the second run must see the filtered frame
+    code = "df = df.iloc[1:]\nprint(len(df))"
+    assert executor.execute_code(code)["text_output"].strip() == "5"
+    result = executor.execute_code(code)
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "4"
+
+
+def test_mutating_input_in_place_is_not_cached(executor):
+    executor.execute_code("scores = [3, 1, 2]")
+    executor.execute_code("scores.sort()\nprint(scores)")
+    assert executor.execute_code("scores.sort()\nprint(scores)")["cached"] is False
+
+
+# ------------------------------------------------------------------
+# Rollback
+# ------------------------------------------------------------------
+def test_rollback_discards_results_of_dropped_versions(executor):
+    executor.execute_code("df = df[df['age'] > 30]")
+    executor.execute_code("print(len(df))")  # computed on version 2
+    assert len(executor.cache) == 1
+
+    executor.rollback(1)
+    assert len(executor.cache) == 0
+
+    result = executor.execute_code("print(len(df))")
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "6"
+
+
+def test_rollback_keeps_results_of_surviving_versions(executor):
+    executor.execute_code("print(len(df))")  # computed on version 1
+    executor.execute_code("df = df[df['age'] > 30]")
+    executor.rollback(1)
+
+    result = executor.execute_code("print(len(df))")
+    assert result["cached"] is True
+    assert result["text_output"].strip() == "6"
+
+
+def test_load_dataset_clears_cache(executor, sample_df):
+    executor.execute_code("print(len(df))")
+    executor.load_dataset(sample_df.head(2))
+    result = executor.execute_code("print(len(df))")
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "2"
+
+
+# ------------------------------------------------------------------
+# Through the API, with the stand-in LLM
+# ------------------------------------------------------------------
+def test_chat_reuses_cached_execution(client):
+    test_client, file_id, backend = client
+    from app.executor import session_executor
+
+    hits_before = session_executor.cache.hits
+    for _ in range(2):
+        response = test_client.post("/chat", json={"file_id": file_id, "message": "How many rows are there"})
+        assert response.status_code == 200
+        assert response.json()["response_text"].strip() == "6"
+    assert session_executor.cache.hits == hits_before + 1
+    assert backend.calls == 3  # welcome message + one code generation per message
+
+
+def test_execute_reports_cache_hits_and_df_changes(client):
+    test_client, _, _ = client
+
+    def run(code):
+        response = test_client.post("/execute", json={"code": code})
+        assert response.status_code == 200
+        return response.json()
+
+    assert run("print(df['age'].max())")["cached"] is False
+    assert run("print(df['age'].max())")["cached"] is True
+    run("df = df[df['age'] < 40]")
+    result = run("print(df['age'].max())")
+    assert result["cached"] is False
+    assert result["text_output"].strip() == "35"
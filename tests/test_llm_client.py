@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from app import llm_client
+from app.llm_client import FakeBackend, LLMClient, LLMTimeoutError
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(llm_client, "RETRY_MAX_DELAY", 0.01)
+
+
+def failing(times, error=ConnectionError("overloaded")):
+    """Responder that raises `error` on the first `times` calls."""
+    calls = {"n": 0}
+
+    def respond(prompt):
+        calls["n"] += 1
+        if calls["n"] <= times:
+            raise error
+        return f"answer to {prompt}"
+    return respond
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_generate():
+    client = LLMClient(FakeBackend(lambda prompt: prompt.upper()))
+    assert run(client.generate("hi")) == "HI"
+    assert client.stats["calls"] == 1
+    assert client.stats["backend_calls"] == 1
+
+
+def test_transient_errors_are_retried():
+    client = LLMClient(FakeBackend(failing(2)), max_retries=3)
+    assert run(client.generate("q")) == "answer to q"
+    assert client.stats["retries"] == 2
+    assert client.stats["backend_calls"] == 3
+    assert client.stats["failures"] == 0
+
+
+def test_gives_up_after_max_retries():
+    backend = FakeBackend(failing(10))
+    client = LLMClient(backend, max_retries=2)
+    with pytest.raises(ConnectionError):
+        run(client.generate("q"))
+    assert backend.calls == 3
+    assert client.stats["retries"] == 2
+    assert client.stats["failures"] == 1
+
+
+def test_non_retryable_errors_fail_immediately():
+    backend = FakeBackend(failing(1, ValueError("bad prompt")))
+    client = LLMClient(backend, max_retries=3)
+    with pytest.raises(ValueError):
+        run(client.generate("q"))
+    assert backend.calls == 1
+    assert client.stats["retries"] == 0
+
+
+def test_slow_attempts_time_out_and_are_retried():
+    client = LLMClient(FakeBackend(latency=0.2), timeout=0.01, deadline=5, max_retries=1)
+    with pytest.raises(LLMTimeoutError):
+        run(client.generate("q"))
+    assert client.stats["timeouts"] == 2
+    assert client.stats["retries"] == 1
+
+
+def test_deadline_caps_all_attempts():
+    client = LLMClient(FakeBackend(latency=0.2), timeout=10, deadline=0.05, max_retries=5)
+
+    async def timed_call():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(LLMTimeoutError):
+            await client.generate("q")
+        return loop.time() - started
+
+    assert run(timed_call()) < 0.15
+    assert client.stats["failures"] == 1
+
+
+def test_identical_prompts_in_flight_are_coalesced():
+    backend = FakeBackend(lambda prompt: f"answer to {prompt}", latency=0.05)
+    client = LLMClient(backend)
+
+    async def burst():
+        return await asyncio.gather(*(client.generate("same") for _ in range(5)), client.generate("other"))
+
+    results = run(burst())
+    assert results == ["answer to same"] * 5 + ["answer to other"]
+    assert backend.calls == 2
+    assert client.stats["coalesced"] == 4
+    assert client.stats["calls"] == 6
+
+
+def test_finished_prompts_are_not_coalesced():
+    backend = FakeBackend(lambda prompt: "ok")
+    client = LLMClient(backend)
+
+    async def twice():
+        await client.generate("q")
+        await client.generate("q")
+
+    run(twice())
+    assert backend.calls == 2
+    assert client.stats["coalesced"] == 0
+
+
+def test_cancelling_one_caller_keeps_the_shared_call():
+    backend = FakeBackend(lambda prompt: "ok", latency=0.05)
+    client = LLMClient(backend)
+
+    async def scenario():
+        first = asyncio.ensure_future(client.generate("q"))
+        second = asyncio.ensure_future(client.generate("q"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert run(scenario()) == "ok"
+    assert backend.calls == 1
+    assert client.stats["coalesced"] == 1
+
+
+def test_concurrency_limit():
+    running = {"now": 0, "peak": 0}
+
+    class CountingBackend(FakeBackend):
+        async def generate(self, prompt):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return prompt
+
+    client = LLMClient(CountingBackend(), max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(client.generate(f"q{i}") for i in range(6)))
+
+    assert run(burst()) == [f"q{i}" for i in range(6)]
+    assert running["peak"] == 2
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from app import services
+
+
+@pytest.fixture(params=["calamine", None], ids=["calamine", "openpyxl"])
+def excel_engine(request, monkeypatch):
+    """Runs a test with calamine and with the openpyxl streaming fallback."""
+    monkeypatch.setattr(services, "EXCEL_ENGINE", request.param)
+    return request.param
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    summary = workbook.active
+    summary.title = "Summary"
+    summary.append(["region", "sales"])
+    summary.append(["north", 10])
+    summary.append(["south", 20])
+
+    year = workbook.create_sheet("2023")
+    year.append(["a", "a", "a.1", "b"])  # repeated header + one that looks like a rename
+    year.append([1, 2, 3, 4])
+    year.append([None, None, None, None])  # blank row inside the data
+    year.append([5, 6, 7, 8])
+    year.append([None, None, None, None])  # trailing blank rows
+    year.append([None, None, None, None])
+
+    path = tmp_path / "upload.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_parse_sheet_name():
+    assert services.parse_sheet_name(None) == 0
+    assert services.parse_sheet_name("") == 0
+    assert services.parse_sheet_name("1") == 1
+    assert services.parse_sheet_name("Summary") == "Summary"
+    assert services.parse_sheet_name("2023", ["Summary", "2023"]) == "2023"
+    assert services.parse_sheet_name("1", ["Summary", "2023"]) == 1
+
+
+def test_dedupe_headers_matches_pandas():
+    assert services._dedupe_headers(["a", "a", "a"]) == ["a", "a.1", "a.2"]
+    assert services._dedupe_headers(["a", "a", "a.1", "b"]) == ["a", "a.2", "a.1", "b"]
+
+
+@pytest.mark.parametrize("sheet_name, columns", [
+    (None, ["region", "sales"]),
+    ("0", ["region", "sales"]),
+    ("Summary", ["region", "sales"]),
+    ("2023", ["a", "a.2", "a.1", "b"]),  # by name, not as index 2023
+    ("1", ["a", "a.2", "a.1", "b"]),
+])
+def test_sheet_selection(excel_engine, workbook_path, sheet_name, columns):
+    df = services._read_excel(workbook_path, sheet_name=sheet_name)
+    assert list(df.columns) == columns
+
+
+def test_blank_rows(excel_engine, workbook_path):
+    df = services._read_excel(workbook_path, sheet_name="2023")
+    assert len(df) == 3  # interior blank row kept, trailing ones dropped
+    assert df.iloc[1].isna().all()
+    assert df["a.2"].tolist()[::2] == [2, 6]
+
+
+def test_column_selection(excel_engine, workbook_path):
+    df = services._read_excel(workbook_path, sheet_name="2023", usecols=["b", "a.1"])
+    assert sorted(df.columns) == ["a.1", "b"]
+    assert df["b"].tolist()[::2] == [4, 8]
+
+
+@pytest.mark.skipif(not services.PARQUET_AVAILABLE, reason="pyarrow not installed")
+def test_parquet_cache_per_selection(excel_engine, workbook_path):
+    summary = services.read_dataset(workbook_path)
+    year = services.read_dataset(workbook_path, sheet_name="2023")
+    year_b = services.read_dataset(workbook_path, sheet_name="2023", usecols="b")
+
+    cache_files = {
+        services.cache_path_for(workbook_path),
+        services.cache_path_for(workbook_path, "2023"),
+        services.cache_path_for(workbook_path, "2023", "b")
+    }
+    assert len(cache_files) == 3
+    assert all(os.path.exists(path) for path in cache_files)
+    assert services.cache_path_for(workbook_path, "0") == services.cache_path_for(workbook_path)
+
+    # Later reads come from the matching cache, not the first selection's
+    assert list(services.read_dataset(workbook_path).columns) == list(summary.columns) == ["region", "sales"]
+    assert list(services.read_dataset(workbook_path, sheet_name="2023").columns) == list(year.columns)
+    assert list(services.read_dataset(workbook_path, sheet_name="2023", usecols="b").columns) == list(year_b.columns) == ["b"]
+
+    services.remove_dataset_files(workbook_path)
+    assert not any(os.path.exists(path) for path in cache_files | {workbook_path})
+
+
+def test_csv_column_selection_is_cached_separately(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("x,y\n1,2\n3,4\n")
+    assert list(services.read_dataset(str(path), usecols="x").columns) == ["x"]
+    assert list(services.read_dataset(str(path)).columns) == ["x", "y"]
@@ -0,0 +1,103 @@
+import base64
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.tables import as_frame, encode_table
+
+
+def decode_arrow(attachment):
+    return pa.ipc.open_stream(base64.b64decode(attachment["data"])).read_all().to_pandas()
+
+
+@pytest.mark.parametrize("fmt", ["json", "arrow"])
+def test_index_that_is_also_a_column(sample_df, fmt):
+    frame = sample_df.set_index("department", drop=False).head()
+    attachment = encode_table("t1", "Table 1", frame, fmt=fmt)
+    assert attachment["columns"] == ["department", "age", "salary", "department.1"]
+    assert attachment["row_count"] == 5
+
+
+@pytest.mark.parametrize("fmt", ["json", "arrow"])
+def test_duplicate_column_names(sample_df, fmt):
+    attachment = encode_table("t1", "Table 1", pd.concat([sample_df, sample_df], axis=1), fmt=fmt)
+    assert attachment["columns"] == ["age", "salary", "department", "age.1", "salary.1", "department.1"]
+    if fmt == "arrow":
+        assert decode_arrow(attachment)["salary.1"].tolist() == sample_df["salary"].tolist()
+
+
+def test_group_by_index_becomes_a_column(sample_df):
+    frame = as_frame(sample_df.groupby("department")["salary"].mean())
+    assert list(frame.columns) == ["department", "salary"]
+
+
+def test_positional_index_is_dropped(sample_df):
+    assert list(as_frame(sample_df).columns) == ["age", "salary", "department"]
+
+
+def test_unnamed_series(sample_df):
+    assert list(as_frame(sample_df["age"] * 2).columns) == ["age"]
+    assert list(as_frame(pd.Series([1, 2])).columns) == ["value"]
+
+
+def test_arrow_falls_back_to_json_for_mixed_objects():
+    attachment = encode_table("t1", "Table 1", pd.DataFrame({"mixed": [1, "a", 2.5]}), fmt="arrow")
+    assert attachment["format"] == "json"
+    assert attachment["rows"] == [[1], ["a"], [2.5]]
+
+
+@pytest.mark.parametrize("fmt", ["json", "arrow"])
+def test_execute_returns_awkward_tables(client, fmt):
+    test_client, _, _ = client
+    for code in ["print(df.set_index('department', drop=False).head())", "print(pd.concat([df, df], axis=1))"]:
+        response = test_client.post("/execute", json={"code": code, "table_format": fmt})
+        assert response.status_code == 200
+        assert len(response.json()["tables"]) == 1
+
+
+def test_unencodable_table_is_sent_as_text(client, monkeypatch):
+    from app import main
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("can't encode")
+
+    monkeypatch.setattr(main, "encode_table", fail)
+    test_client, _, _ = client
+    response = test_client.post("/execute", json={"code": "print(df.head(2))"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["tables"] == []
+    assert "salary" in body["text_output"]
+
+
+def test_table_store_is_bounded_by_bytes(executor, monkeypatch):
+    from app import executor as executor_module
+
+    monkeypatch.setattr(executor_module, "MAX_STORED_TABLE_BYTES", 600)  # two copies of sample_df
+    for _ in range(4):
+        executor.execute_code("print(df.sample(frac=1))")  # never served from the cache
+    assert list(executor.tables) == ["t3", "t4"]
+    with pytest.raises(KeyError):
+        executor.get_table("t1")
+
+
+def test_newest_table_is_kept_even_if_too_big(executor, monkeypatch):
+    from app import executor as executor_module
+
+    monkeypatch.setattr(executor_module, "MAX_STORED_TABLE_BYTES", 1)
+    executor.execute_code("print(df)\nprint(df.head(2))")
+    assert list(executor.tables) == ["t2"]
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("df.describe()", "Here are the results (see the table below)."),
+    ("plt.plot(df['age'])", "Done! (Check the plot)"),
+    ("x = 1", "Done! The code ran without producing any output."),
+])
+def test_chat_reply_when_nothing_is_printed(client, code, expected):
+    test_client, file_id, backend = client
+    backend.responder = lambda prompt: code
+    response = test_client.post("/chat", json={"file_id": file_id, "message": "summarize the data"})
+    assert response.status_code == 200
+    assert response.json()["response_text"] == expected
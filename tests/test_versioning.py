@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.versioning import DatasetHistory
+
+
+def versions(executor):
+    return executor.history.list_versions()
+
+
+def test_upload_is_version_one(executor):
+    [initial] = versions(executor)
+    assert initial["version_id"] == 1
+    assert initial["shape"] == [6, 3]
+    assert initial["changed_columns"] == ["age", "salary", "department"]
+
+
+def test_only_changes_create_versions(executor):
+    executor.execute_code("print(df.describe())")
+    executor.execute_code("x = df['age'].sum()")
+    assert len(versions(executor)) == 1
+
+    executor.execute_code("df['bonus'] = df['salary'] * 0.1")
+    latest = versions(executor)[-1]
+    assert latest["version_id"] == 2
+    assert latest["changed_columns"] == ["bonus"]
+    assert latest["label"] == "df['bonus'] = df['salary'] * 0.1"
+
+
+def test_unchanged_columns_are_shared(executor):
+    executor.execute_code("df['age'] = df['age'] + 1")
+    old, new = executor.history.get(1), executor.history.get(2)
+    assert new.columns["salary"] is old.columns["salary"]
+    assert new.tokens["salary"] == old.tokens["salary"]
+    assert new.tokens["age"] != old.tokens["age"]
+    # Only the new age column is added to what the history holds
+    assert versions(executor)[-1]["added_bytes"] == old.columns["age"].memory_usage(index=False)
+
+
+def test_diff(executor):
+    executor.execute_code("df = df.drop(columns=['department'])")
+    executor.execute_code("df['age'] = df['age'] * 2\ndf['senior'] = df['age'] > 60")
+    executor.execute_code("df = df[df['senior']]")
+    assert executor.history.diff(1, 3) == {
+        "from_version": 1,
+        "to_version": 3,
+        "shape_before": [6, 3],
+        "shape_after": [6, 3],
+        "added_columns": ["senior"],
+        "removed_columns": ["department"],
+        "changed_columns": ["age"],
+        "rows_added": 0,
+        "rows_removed": 0
+    }
+    assert executor.history.diff(3, 4)["rows_removed"] == 3
+
+
+def test_in_place_edits_do_not_change_earlier_versions(executor, sample_df):
+    expected = sample_df.copy()  # sample_df itself is the session's df
+    executor.execute_code("df.loc[0, 'age'] = 99")
+    executor.execute_code("df['salary'] *= 2")
+    original = executor.history.get(1).to_frame()
+    pd.testing.assert_frame_equal(original, expected)
+    assert executor.locals["df"].loc[0, "age"] == 99
+
+
+def test_rollback_restores_df(executor, sample_df):
+    expected = sample_df.copy()
+    executor.execute_code("df['age'] = 0")
+    executor.execute_code("df = df.drop(columns=['salary'])")
+    df = executor.rollback(1)
+    pd.testing.assert_frame_equal(df, expected)
+    assert executor.locals["df"] is df
+    assert [v["version_id"] for v in versions(executor)] == [1]
+
+    # New versions continue after the dropped ones
+    executor.execute_code("df['age'] = 1")
+    assert versions(executor)[-1]["version_id"] == 4
+
+
+def test_rollback_then_edit_keeps_the_restored_version_intact(executor, sample_df):
+    expected = sample_df.copy()
+    executor.execute_code("df['age'] = 0")
+    executor.rollback(1)
+    executor.execute_code("df.loc[1, 'salary'] = -1")
+    pd.testing.assert_frame_equal(executor.history.get(1).to_frame(), expected)
+
+
+def test_unknown_version(executor):
+    with pytest.raises(KeyError):
+        executor.rollback(42)
+
+
+def test_byte_cap_evicts_oldest_versions():
+    df = pd.DataFrame({"a": np.arange(1000, dtype="int64"), "b": np.zeros(1000)})
+    evicted = []
+    history = DatasetHistory(max_bytes=20_000)  # initial frame is 16 kB
+    history.on_evict = evicted.extend
+    history.reset(df)
+
+    for i in range(1, 4):
+        df = df.assign(a=df["a"] + i)  # 8 kB per version
+        history.commit(df, label=f"step {i}")
+
+    assert evicted == [1, 2, 3]
+    assert [v["version_id"] for v in history.list_versions()] == [4]
+    assert history.memory_usage() == 16_000  # b is still shared with version 1
+
+
+def test_current_version_is_never_evicted():
+    history = DatasetHistory(max_bytes=1)
+    history.reset(pd.DataFrame({"a": range(100)}))
+    assert history.current.version_id == 1
+
+
+def test_new_upload_resets_history(executor, sample_df):
+    executor.execute_code("df['age'] = 0")
+    executor.load_dataset(sample_df.head(2))
+    assert [v["shape"] for v in versions(executor)] == [[2, 3]]
+
+
+@pytest.mark.parametrize("code", [
+    "df = pd.concat([df, df], axis=1)",
+    "df = pd.concat([df, pd.get_dummies(df['department'], prefix='age').rename(columns=lambda c: 'age')], axis=1)",
+])
+def test_duplicate_column_names(executor, code):
+    result = executor.execute_code(code)
+    assert result["error"] is None
+    assert executor.execute_code("print(1)")["text_output"] == "1\n"
+
+    frame = executor.history.current.to_frame()
+    pd.testing.assert_frame_equal(frame, executor.locals["df"])
+    assert executor.history.diff(1, 2)["removed_columns"] == []
+
+    executor.rollback(1)
+    assert list(executor.locals["df"].columns) == ["age", "salary", "department"]
+
+
+def test_versioning_failure_does_not_fail_execution(executor, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    executor.execute_code("print(len(df))")
+    monkeypatch.setattr(executor.history, "commit", fail)
+    result = executor.execute_code("df = df.head(2)")
+    assert result["error"] is None
+
+    # `df` no longer matches its version id, so nothing reading it is cached
+    result = executor.execute_code("print(len(df))")
+    assert result["cached"] is False
+    assert result["text_output"] == "2\n"